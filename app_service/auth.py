@@ -0,0 +1,90 @@
+import asyncio
+import hashlib
+import time
+import httpx
+from jose import JWTError, jwt
+from fastapi import HTTPException
+from config import settings
+from http_client import user_service_timeout
+from upstream import user_service_upstream
+from redis_client import redis_client
+from session_cache import session_cache
+
+JWT_VERIFY_KEY = settings.JWT_PUBLIC_KEY or settings.SECRET_KEY
+
+# Cached sessions are only trusted while the revocation listener is subscribed
+revocations_connected = False
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def decode_token(token: str) -> dict:
+    try:
+        payload = jwt.decode(token, JWT_VERIFY_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+
+    if payload.get("sub") is None:
+        raise HTTPException(status_code=401, detail="Invalid or expired token")
+    return payload
+
+async def verify_token_with_user_service(token: str) -> dict:
+    try:
+        response = await user_service_upstream.request(
+            "GET",
+            f"{settings.USER_SERVICE_URL}/verify-token/",
+            idempotent=True,
+            hedge=True,
+            timeout=user_service_timeout,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code >= 500:
+            raise HTTPException(status_code=503, detail="User service unavailable")
+        if response.status_code != 200:
+            raise HTTPException(status_code=401, detail="Invalid or expired token")
+        return response.json()
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail="User service unavailable")
+
+async def verify_token(token: str) -> dict:
+    # Signature and exp are checked locally, so forged or expired tokens never leave the process
+    payload = decode_token(token)
+    digest = token_digest(token)
+
+    if revocations_connected:
+        cached_session = session_cache.get(digest)
+        if cached_session:
+            return cached_session
+
+    # The session itself (not revoked by logout) is still confirmed by user_service
+    session = await verify_token_with_user_service(token)
+    if revocations_connected:
+        session_cache.set(digest, session, ttl_seconds=payload.get("exp", 0) - time.time())
+    return session
+
+def invalidate_cached_session(token: str):
+    session_cache.invalidate(token_digest(token))
+
+async def listen_for_revocations():
+    global revocations_connected
+
+    while True:
+        pubsub = redis_client.pubsub()
+        try:
+            await pubsub.subscribe(settings.SESSION_REVOCATION_CHANNEL)
+            # Revocations may have been missed while we were disconnected
+            session_cache.clear()
+            revocations_connected = True
+
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    session_cache.invalidate(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Session revocation listener disconnected: {str(e)}")
+            await asyncio.sleep(1)
+        finally:
+            revocations_connected = False
+            session_cache.clear()
+            await pubsub.aclose()
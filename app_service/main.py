@@ -1,43 +1,67 @@
-from fastapi import FastAPI, HTTPException, Depends
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from fastapi import FastAPI, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 import httpx
 from config import settings
+from http_client import (
+    start_http_client, close_http_client, pool_stats,
+    user_service_timeout, scraper_service_timeout, scraper_stream_timeout
+)
+from upstream import user_service_upstream, scraper_service_upstream, circuit_stats
+from proxy import stream_upstream, relay_json, CONCURRENCY_LEASE_HEADER
+from auth import verify_token, invalidate_cached_session, listen_for_revocations
+from session_cache import session_cache
+from redis_client import redis_client
+from tracing import setup_tracing
+from metrics import setup_metrics, register_stats
 
-app = FastAPI(title="App Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    revocation_listener = asyncio.create_task(listen_for_revocations())
+    yield
+    revocation_listener.cancel()
+    with suppress(asyncio.CancelledError):
+        await revocation_listener
+    await close_http_client()
+    await redis_client.aclose()
+
+app = FastAPI(title="App Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+setup_metrics(app)
+setup_tracing(app)
+
+register_stats("http_pool", pool_stats)
+register_stats("upstream", circuit_stats, label="upstream")
 
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 @app.get("/")
 def health_check():
-    return {"service": "App Service", "status": "running"}
-
-async def verify_token_with_user_service(token: str) -> dict:
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.USER_SERVICE_URL}/verify-token/",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=401, detail="Invalid or expired token")
-            return response.json()
-    except httpx.RequestError:
-        raise HTTPException(status_code=503, detail="User service unavailable")
+    return {
+        "service": "App Service",
+        "status": "running",
+        "http_pool": pool_stats(),
+        "circuit_breakers": circuit_stats(),
+        "session_cache_size": len(session_cache)
+    }
 
 # Endpoints forwarded to user_service
 @app.post("/auth/register/")
 async def register_user(user_data: dict):
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.USER_SERVICE_URL}/register/",
-                json=user_data
-                )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            
-            return response.json()            
+        response = await user_service_upstream.request(
+            "POST",
+            f"{settings.USER_SERVICE_URL}/register/",
+            timeout=user_service_timeout,
+            json=user_data
+            )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        
+        return relay_json(response)            
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail="User service unavailable.")
     except Exception as e:
@@ -46,21 +70,22 @@ async def register_user(user_data: dict):
 @app.post("/auth/login/")
 async def login_user(login_data: dict):
     try:
-        async with httpx.AsyncClient() as client:
-            form_data = {
-                "username": login_data["username"],
-                "password": login_data["password"]
-            }
-            
-            response = await client.post(
-                f"{settings.USER_SERVICE_URL}/login/", 
-                data=form_data
-                )
+        form_data = {
+            "username": login_data["username"],
+            "password": login_data["password"]
+        }
+        
+        response = await user_service_upstream.request(
+            "POST",
+            f"{settings.USER_SERVICE_URL}/login/",
+            timeout=user_service_timeout,
+            data=form_data
+            )
 
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            
-            return response.json()
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        
+        return relay_json(response)
             
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail="User service unavailable.")
@@ -74,15 +99,17 @@ async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2
     
     try:
         token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.USER_SERVICE_URL}/logout/",
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
- 
-            return response.json()
+        response = await user_service_upstream.request(
+            "POST",
+            f"{settings.USER_SERVICE_URL}/logout/",
+            timeout=user_service_timeout,
+            headers={"Authorization": f"Bearer {token}"}
+        )
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+
+        invalidate_cached_session(token)
+        return relay_json(response)
     
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail="User service unavailable.")
@@ -90,22 +117,26 @@ async def logout_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2
         raise HTTPException(status_code=500, detail="Internal server error.")
     
 @app.get("/auth/me")
+@app.get("/auth/me/")
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentication required")
     
     try:
         token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{settings.USER_SERVICE_URL}/users/me/",
-                headers={"Authorization": f"Bearer {token}"}
-            )
+        response = await user_service_upstream.request(
+            "GET",
+            f"{settings.USER_SERVICE_URL}/users/me/",
+            idempotent=True,
+            hedge=True,
+            timeout=user_service_timeout,
+            headers={"Authorization": f"Bearer {token}"}
+        )
 
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            
-            return response.json()
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        
+        return relay_json(response)
         
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail="User service unavailable.")
@@ -116,26 +147,94 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(o
 @app.post("/scrape/")
 async def scrape_company(
     scrape_data: dict,
+    request: Request,
     credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
 ):
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentication required")
     
+    token = credentials.credentials
+    await verify_token(token)
+
+    headers = {"Authorization": f"Bearer {token}"}
+    if CONCURRENCY_LEASE_HEADER in request.headers:
+        headers[CONCURRENCY_LEASE_HEADER] = request.headers[CONCURRENCY_LEASE_HEADER]
+
     try:
-        token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.SCRAPER_SERVICE_URL}/scrape/",
-                json=scrape_data,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            
-            return response.json()
+        response = await scraper_service_upstream.request(
+            "POST",
+            f"{settings.SCRAPER_SERVICE_URL}/scrape/",
+            timeout=scraper_service_timeout,
+            json=scrape_data,
+            headers=headers
+        )
+        
+        if response.status_code != 200:
+            raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
+        
+        return relay_json(response)
         
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail="Scraper service unavailable.")
     except Exception as e:
         raise HTTPException(status_code=500, detail="Internal server error.")
+
+@app.post("/scrape/batch")
+async def scrape_batch(
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    # One token check covers every IDNO in the batch
+    token = credentials.credentials
+    await verify_token(token)
+
+    return await stream_upstream(
+        request,
+        f"{settings.SCRAPER_SERVICE_URL}/scrape/batch",
+        token,
+        scraper_stream_timeout,
+        scraper_service_upstream
+    )
+
+@app.get("/scrape/jobs/{job_id}")
+async def get_scrape_job(
+    job_id: str,
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    token = credentials.credentials
+    await verify_token(token)
+
+    return await stream_upstream(
+        request,
+        f"{settings.SCRAPER_SERVICE_URL}/scrape/jobs/{job_id}",
+        token,
+        scraper_stream_timeout,
+        scraper_service_upstream
+    )
+
+@app.get("/scrape/{idno}/status")
+async def get_scrape_status(
+    idno: str,
+    request: Request,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    token = credentials.credentials
+    await verify_token(token)
+
+    return await stream_upstream(
+        request,
+        f"{settings.SCRAPER_SERVICE_URL}/scrape/{idno}/status",
+        token,
+        scraper_stream_timeout,
+        scraper_service_upstream
+    )
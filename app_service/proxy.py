@@ -0,0 +1,74 @@
+import httpx
+from fastapi import Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from http_client import get_http_client
+from upstream import Upstream
+
+# The gateway's scrape concurrency lease, which scraper_service hands to the jobs it queues
+CONCURRENCY_LEASE_HEADER = "x-concurrency-lease"
+
+FORWARDED_REQUEST_HEADERS = ("accept", "content-type", "content-length", "transfer-encoding", CONCURRENCY_LEASE_HEADER)
+
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade"
+}
+
+RELAYED_RESPONSE_HEADERS = ("etag",)
+
+def relay_json(response: httpx.Response) -> Response:
+    # The upstream body is already JSON, so it is passed through instead of being decoded and re-encoded
+    return Response(
+        content=response.content,
+        status_code=response.status_code,
+        headers={key: response.headers[key] for key in RELAYED_RESPONSE_HEADERS if key in response.headers},
+        media_type="application/json"
+    )
+
+async def stream_upstream(
+    request: Request,
+    url: str,
+    token: str,
+    timeout: httpx.Timeout,
+    upstream: Upstream
+) -> StreamingResponse:
+    # Relays the upstream response as it arrives, which long-poll and SSE responses need
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() in FORWARDED_REQUEST_HEADERS
+    }
+    headers["Authorization"] = f"Bearer {token}"
+    has_body = "content-length" in request.headers or "transfer-encoding" in request.headers
+
+    client = get_http_client()
+    upstream_request = client.build_request(
+        request.method,
+        url,
+        params=request.query_params,
+        headers=headers,
+        content=request.stream() if has_body else None,
+        timeout=timeout
+    )
+
+    try:
+        # Streamed request bodies cannot be replayed, so only body-less GETs are retried
+        response = await upstream.send(upstream_request, idempotent=not has_body and request.method == "GET", stream=True)
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail=f"{upstream.name} unavailable.")
+
+    return StreamingResponse(
+        response.aiter_raw(),
+        status_code=response.status_code,
+        headers={
+            key: value for key, value in response.headers.items()
+            if key.lower() not in HOP_BY_HOP_HEADERS
+        },
+        background=BackgroundTask(response.aclose)
+    )
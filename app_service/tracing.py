@@ -0,0 +1,50 @@
+from typing import Optional
+from fastapi import FastAPI
+import httpx
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.httpx import HTTPXClientInstrumentor
+
+from config import settings
+
+SERVICE_NAME = "app_service"
+
+def span_exporter() -> Optional[SpanExporter]:
+    if settings.TRACING_EXPORTER == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        # One JSON span per line
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE_PATH, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    return None
+
+def setup_tracing(app: Optional[FastAPI] = None):
+    if not settings.TRACING_ENABLED:
+        return
+
+    # Sampling is decided once at the edge and followed by every downstream hop
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO))
+    )
+    exporter = span_exporter()
+    if exporter is not None:
+        # Spans are exported in batches off the request path
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    if app is not None:
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+
+def instrument_http_client(client: httpx.AsyncClient):
+    # Adds a client span and the W3C traceparent header to every request on this client
+    if settings.TRACING_ENABLED:
+        HTTPXClientInstrumentor.instrument_client(client)
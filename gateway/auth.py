@@ -0,0 +1,15 @@
+from typing import Optional, Dict, Any
+from jose import JWTError, jwt
+
+from config import settings
+
+JWT_VERIFY_KEY = settings.JWT_PUBLIC_KEY or settings.SECRET_KEY
+
+def token_claims(authorization: str) -> Optional[Dict[str, Any]]:
+    # Signature and expiry only; revocation is checked by app_service
+    if not authorization.lower().startswith("bearer "):
+        return None
+    try:
+        return jwt.decode(authorization[7:], JWT_VERIFY_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        return None
@@ -0,0 +1,50 @@
+from typing import Optional
+import orjson
+from fastapi import Request
+from fastapi.responses import Response
+
+from redis_client import redis_client
+from auth import token_claims
+
+# Written by scraper_service next to each cached company and expired at the soft TTL,
+# so stale entries always reach the scraper and get refreshed
+COMPANY_ETAG_KEY = "company_etag:{idno}"
+
+# The session user_service writes at login and deletes at logout
+SESSION_TOKEN_KEY = "token:{token}"
+
+def etag_header(content_hash: str) -> str:
+    # Weak, because the same data may be served gzip-, brotli- or un-encoded
+    return f'W/"{content_hash}"'
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison, as If-None-Match requires
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in tags
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+async def cached_etag(request: Request, body: bytes) -> Optional[str]:
+    # Only a plain cache lookup by a validly signed, not logged-out token is answered without app_service
+    try:
+        lookup = orjson.loads(body)
+    except orjson.JSONDecodeError:
+        return None
+    if not isinstance(lookup, dict) or not lookup.get("idno") or lookup.get("force_refresh"):
+        return None
+    authorization = request.headers.get("authorization", "")
+    if token_claims(authorization) is None:
+        return None
+
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.get(COMPANY_ETAG_KEY.format(idno=lookup["idno"]))
+        pipe.exists(SESSION_TOKEN_KEY.format(token=authorization[7:]))
+        content_hash, session_exists = await pipe.execute()
+    except Exception as e:
+        print(f"Error reading cached ETag: {str(e)}")
+        return None
+    return etag_header(content_hash) if content_hash and session_exists else None
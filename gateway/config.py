@@ -5,5 +5,58 @@ load_dotenv()
 
 class Settings:
     APP_SERVICE_URL: str = os.getenv("APP_SERVICE_URL", "http://localhost:8001")
-    
-settings = Settings()
\ No newline at end of file
+    APP_SERVICE_TIMEOUT: float = float(os.getenv("APP_SERVICE_TIMEOUT", "30"))
+
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_CONNECT_TIMEOUT: float = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+    HTTP2_ENABLED: bool = os.getenv("HTTP2_ENABLED", "false").lower() == "true"
+
+    CIRCUIT_FAILURE_THRESHOLD: int = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+    CIRCUIT_RESET_TIMEOUT: float = float(os.getenv("CIRCUIT_RESET_TIMEOUT", "30"))
+    UPSTREAM_RETRIES: int = int(os.getenv("UPSTREAM_RETRIES", "2"))
+    UPSTREAM_RETRY_BASE_DELAY: float = float(os.getenv("UPSTREAM_RETRY_BASE_DELAY", "0.1"))
+    UPSTREAM_RETRY_MAX_DELAY: float = float(os.getenv("UPSTREAM_RETRY_MAX_DELAY", "1"))
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "true").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_DELAY: float = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+
+    SECRET_KEY: str = os.getenv("SECRET_KEY", "default-secret-key")
+    ALGORITHM: str = os.getenv("ALGORITHM", "HS256")
+    # Public key for asymmetric algorithms (RS256/ES256), falls back to the shared secret
+    JWT_PUBLIC_KEY: str = os.getenv("JWT_PUBLIC_KEY", "")
+
+    REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
+    REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
+
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_DEFAULT_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_DEFAULT_PER_MINUTE", "120"))
+    RATE_LIMIT_DEFAULT_BURST: int = int(os.getenv("RATE_LIMIT_DEFAULT_BURST", "60"))
+    RATE_LIMIT_LOGIN_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_LOGIN_PER_MINUTE", "10"))
+    RATE_LIMIT_LOGIN_BURST: int = int(os.getenv("RATE_LIMIT_LOGIN_BURST", "5"))
+    RATE_LIMIT_REGISTER_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_REGISTER_PER_MINUTE", "5"))
+    RATE_LIMIT_REGISTER_BURST: int = int(os.getenv("RATE_LIMIT_REGISTER_BURST", "3"))
+    RATE_LIMIT_SCRAPE_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_SCRAPE_PER_MINUTE", "30"))
+    RATE_LIMIT_SCRAPE_BURST: int = int(os.getenv("RATE_LIMIT_SCRAPE_BURST", "10"))
+    # Batch requests are charged one token per IDNO
+    RATE_LIMIT_BATCH_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_BATCH_PER_MINUTE", "300"))
+    RATE_LIMIT_BATCH_BURST: int = int(os.getenv("RATE_LIMIT_BATCH_BURST", "1000"))
+    # Scrape requests and batches whose jobs are still queued or running, per user
+    RATE_LIMIT_SCRAPE_CONCURRENCY: int = int(os.getenv("RATE_LIMIT_SCRAPE_CONCURRENCY", "3"))
+    # Concurrency leases expire after this long in case their gateway or worker dies without releasing them
+    RATE_LIMIT_LEASE_TTL: int = int(os.getenv("RATE_LIMIT_LEASE_TTL", "3600"))
+
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    # Smaller bodies fit in a packet or two either way, so compressing them only costs CPU
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    # "otlp" sends to OTEL_EXPORTER_OTLP_ENDPOINT, "file" appends JSON lines to TRACING_FILE_PATH
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "otlp")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))
+
+settings = Settings()
@@ -0,0 +1,50 @@
+import httpx
+from typing import Optional, Dict, Any
+from config import settings
+from tracing import instrument_http_client
+
+http_client: Optional[httpx.AsyncClient] = None
+
+app_service_timeout = httpx.Timeout(settings.APP_SERVICE_TIMEOUT, connect=settings.HTTP_CONNECT_TIMEOUT)
+
+async def start_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        http2=settings.HTTP2_ENABLED,
+        timeout=app_service_timeout
+    )
+    instrument_http_client(http_client)
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    if http_client is None:
+        raise RuntimeError("HTTP client is not started")
+    return http_client
+
+def pool_stats() -> Dict[str, Any]:
+    # httpcore does not expose pool usage publicly, so read it from the transport's pool
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    pending = list(getattr(pool, "_requests", []))
+
+    active = sum(1 for connection in connections if not connection.is_idle())
+    queued = sum(1 for request in pending if request.is_queued())
+
+    return {
+        "max_connections": settings.HTTP_MAX_CONNECTIONS,
+        "open_connections": len(connections),
+        "active_connections": active,
+        "idle_connections": len(connections) - active,
+        "queued_requests": queued,
+        "saturation": round(active / settings.HTTP_MAX_CONNECTIONS, 3)
+    }
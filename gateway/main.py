@@ -1,94 +1,52 @@
-from fastapi import FastAPI, Depends, HTTPException
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import httpx
-from config import settings
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from http_client import start_http_client, close_http_client, pool_stats
+from proxy import ROUTES, PROXY_METHODS, ProxyRoute, proxy_request
+from rate_limit import RateLimitMiddleware
+from compression import CompressionMiddleware
+from redis_client import redis_client
+from upstream import circuit_stats
+from tracing import setup_tracing
+from metrics import setup_metrics, register_stats
 
-app = FastAPI(title="Gateway Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await start_http_client()
+    yield
+    await close_http_client()
+    await redis_client.aclose()
 
-oauth2_scheme = HTTPBearer(auto_error=False)
+app = FastAPI(title="Gateway Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+# Innermost, so request metrics include the time spent compressing
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(RateLimitMiddleware)
+# Added after the rate limiter so rejected requests are counted too
+setup_metrics(app)
+setup_tracing(app)
+
+register_stats("http_pool", pool_stats)
+register_stats("upstream", circuit_stats, label="upstream")
 
 @app.get("/")
 def health_check():
-    return {"service": "Gateway Service", "status": "running"}
-
-# Auth endpoints - forward to app_service
-@app.post("/auth/register/")
-async def register(user_data: dict):
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{settings.APP_SERVICE_URL}/auth/register/", json=user_data)
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            return response.json()
-    except httpx.RequestError:
-       raise HTTPException(status_code=503, detail="App service unavailable")
-    except Exception:
-       raise HTTPException(status_code=500, detail="Internal server error")
+    return {
+        "service": "Gateway Service",
+        "status": "running",
+        "http_pool": pool_stats(),
+        "circuit_breakers": circuit_stats()
+    }
 
-@app.post("/auth/login/")
-async def login(login_data: dict):
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{settings.APP_SERVICE_URL}/auth/login/", json=login_data)
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            return response.json()
-    except httpx.RequestError:
-       raise HTTPException(status_code=503, detail="App service unavailable")
-    except Exception:
-       raise HTTPException(status_code=500, detail="Internal server error")
+def create_proxy_endpoint(route: ProxyRoute):
+    async def proxy_endpoint(request: Request, path: str = ""):
+        return await proxy_request(request, route, path)
+    return proxy_endpoint
 
-@app.post("/auth/logout/")
-async def logout(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    if not credentials:
-        raise HTTPException(status_code=401, detail="Token required")
-    try:
-        token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.post(f"{settings.APP_SERVICE_URL}/auth/logout/", headers={"Authorization": f"Bearer {token}"})
-            
-            if response.status_code == 200:
-                return {"message": "Logout successful"}
-            else:
-                raise HTTPException(status_code=response.status_code, detail="Logout failed")
-    except httpx.RequestError:
-       raise HTTPException(status_code=503, detail="App service unavailable")
-    except Exception:
-       raise HTTPException(status_code=500, detail="Internal server error")
-        
-@app.get("/auth/me/")
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    if not credentials:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    try:
-        token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.get(f"{settings.APP_SERVICE_URL}/auth/me", headers={"Authorization": f"Bearer {token}"})
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            return response.json()
-    except httpx.RequestError:
-       raise HTTPException(status_code=503, detail="App service unavailable")
-    except Exception:
-       raise HTTPException(status_code=500, detail="Internal server error")
-   
-# Scraper endpoints - forward to app_service
-@app.post("/scrape/")
-async def scrape_company(scrape_data: dict, credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    if not credentials:
-        raise HTTPException(status_code=401, detail="Authentication required")
-    try:
-        token = credentials.credentials
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{settings.APP_SERVICE_URL}/scrape/", 
-                json=scrape_data,
-                headers={"Authorization": f"Bearer {token}"}
-            )
-            if response.status_code != 200:
-                raise HTTPException(status_code=response.status_code, detail=response.json().get("detail"))
-            return response.json()
-    except httpx.RequestError:
-       raise HTTPException(status_code=503, detail="App service unavailable")
-    except Exception:
-       raise HTTPException(status_code=500, detail="Internal server error")
+# Auth and scraper endpoints - streamed through to app_service
+for route in ROUTES:
+    app.add_api_route(
+        f"{route.prefix}{{path:path}}",
+        create_proxy_endpoint(route),
+        methods=PROXY_METHODS,
+        name=f"proxy_{route.prefix.strip('/')}"
+    )
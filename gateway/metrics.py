@@ -0,0 +1,108 @@
+import time
+from functools import wraps
+from typing import Callable, Dict, Any, Optional, Awaitable
+from fastapi import FastAPI, Request, Response
+from prometheus_client import Counter, Histogram, Gauge, REGISTRY, CONTENT_TYPE_LATEST, generate_latest
+from prometheus_client.core import GaugeMetricFamily
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+
+REQUEST_COUNT = Counter(
+    "http_requests_total",
+    "HTTP requests handled, by route and status code",
+    ["method", "route", "status"]
+)
+REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "Time from receiving a request until its response body was sent",
+    ["method", "route"]
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    "http_requests_in_progress",
+    "HTTP requests currently being handled",
+    ["method"]
+)
+UPSTREAM_DURATION = Histogram(
+    "upstream_request_duration_seconds",
+    "Time until an upstream service returned response headers, by outcome",
+    ["upstream", "outcome"]
+)
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = 500
+        started = time.perf_counter()
+
+        async def send_with_status(message: Message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        REQUESTS_IN_PROGRESS.labels(method).inc()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            REQUESTS_IN_PROGRESS.labels(method).dec()
+            # The route template keeps label cardinality bounded; unmatched paths share one label
+            route = scope.get("route")
+            route_path = getattr(route, "path", "unmatched")
+            REQUEST_COUNT.labels(method, route_path, str(status)).inc()
+            REQUEST_DURATION.labels(method, route_path).observe(time.perf_counter() - started)
+
+class StatsCollector:
+    # Exposes the numeric fields of a stats() dict as gauges, read at scrape time.
+    # With a label, stats() returns one such dict per label value.
+    def __init__(self, prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+        self.prefix = prefix
+        self.stats = stats
+        self.label = label
+
+    def collect(self):
+        stats = self.stats()
+        rows = stats.items() if self.label else [(None, stats)]
+
+        families: Dict[str, GaugeMetricFamily] = {}
+        for label_value, fields in rows:
+            for field, value in fields.items():
+                if not isinstance(value, (int, float)):
+                    continue
+                name = f"{self.prefix}_{field}"
+                if name not in families:
+                    families[name] = GaugeMetricFamily(
+                        name, f"{self.prefix} {field.replace('_', ' ')}",
+                        labels=[self.label] if self.label else []
+                    )
+                families[name].add_metric([label_value] if self.label else [], float(value))
+        return list(families.values())
+
+def register_stats(prefix: str, stats: Callable[[], Dict[str, Any]], label: Optional[str] = None):
+    REGISTRY.register(StatsCollector(prefix, stats, label))
+
+def timed(histogram: Histogram, *labels: str):
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.labels(*labels).observe(time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+def setup_metrics(app: FastAPI, before_collect: Optional[Callable[[], Awaitable[None]]] = None):
+    app.add_middleware(MetricsMiddleware)
+
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics(request: Request):
+        if before_collect is not None:
+            await before_collect()
+        return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,134 @@
+import httpx
+from typing import Optional, Iterable
+from fastapi import Request, HTTPException
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
+from config import settings
+from http_client import get_http_client, app_service_timeout
+from upstream import Upstream, app_service_upstream
+from conditional import cached_etag, etag_matches, not_modified
+
+PROXY_METHODS = ["GET", "POST", "PUT", "PATCH", "DELETE"]
+
+# Headers that describe a single connection and must not be forwarded
+HOP_BY_HOP_HEADERS = {
+    "connection",
+    "keep-alive",
+    "proxy-authenticate",
+    "proxy-authorization",
+    "te",
+    "trailer",
+    "transfer-encoding",
+    "upgrade",
+    "host"
+}
+
+class ProxyRoute:
+    def __init__(
+        self,
+        prefix: str,
+        upstream_url: str,
+        upstream: Upstream,
+        upstream_prefix: Optional[str] = None,
+        public_paths: Iterable[str] = (),
+        hedged_paths: Iterable[str] = (),
+        conditional_paths: Iterable[str] = (),
+        timeout: httpx.Timeout = app_service_timeout
+    ):
+        self.prefix = prefix
+        self.upstream_url = upstream_url.rstrip("/")
+        self.upstream = upstream
+        self.upstream_prefix = upstream_prefix if upstream_prefix is not None else prefix
+        self.public_paths = set(public_paths)
+        # Short idempotent reads worth racing a second request for when the first is slow
+        self.hedged_paths = set(hedged_paths)
+        # Company lookups that may be answered with 304 from the cached ETag
+        self.conditional_paths = set(conditional_paths)
+        self.timeout = timeout
+
+    def requires_auth(self, path: str) -> bool:
+        return path not in self.public_paths
+
+    def upstream_target(self, path: str, query: str) -> str:
+        target = f"{self.upstream_url}{self.upstream_prefix}{path}"
+        return f"{target}?{query}" if query else target
+
+ROUTES = [
+    ProxyRoute(
+        "/auth/",
+        settings.APP_SERVICE_URL,
+        app_service_upstream,
+        public_paths={"register/", "login/"},
+        hedged_paths={"me", "me/"}
+    ),
+    ProxyRoute("/scrape/", settings.APP_SERVICE_URL, app_service_upstream, conditional_paths={""}),
+]
+
+def forward_request_headers(request: Request) -> dict:
+    headers = {
+        key: value for key, value in request.headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS
+    }
+    if request.client:
+        forwarded_for = request.headers.get("x-forwarded-for")
+        headers["x-forwarded-for"] = f"{forwarded_for}, {request.client.host}" if forwarded_for else request.client.host
+    return headers
+
+def forward_response_headers(response: httpx.Response) -> dict:
+    return {
+        key: value for key, value in response.headers.items()
+        if key.lower() not in HOP_BY_HOP_HEADERS
+    }
+
+def has_body(request: Request) -> bool:
+    return "content-length" in request.headers or "transfer-encoding" in request.headers
+
+async def proxy_request(request: Request, route: ProxyRoute, path: str) -> Response:
+    if route.requires_auth(path) and not request.headers.get("authorization", "").lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    body = has_body(request)
+    content = request.stream() if body else None
+    if_none_match = request.headers.get("if-none-match")
+    conditional = bool(if_none_match) and request.method == "POST" and path in route.conditional_paths
+    if conditional:
+        # Lookup bodies are tiny, so reading them to find the IDNO costs nothing
+        content = await request.body()
+        etag = await cached_etag(request, content)
+        if etag and etag_matches(if_none_match, etag):
+            return not_modified(etag)
+
+    client = get_http_client()
+    upstream_request = client.build_request(
+        request.method,
+        route.upstream_target(path, request.url.query),
+        headers=forward_request_headers(request),
+        content=content,
+        timeout=route.timeout
+    )
+
+    # Streamed request bodies cannot be replayed, so only body-less GETs are retried or hedged
+    idempotent = request.method == "GET" and not body
+    try:
+        upstream_response = await route.upstream.send(
+            upstream_request,
+            idempotent=idempotent,
+            hedge=path in route.hedged_paths,
+            stream=True
+        )
+    except httpx.RequestError:
+        raise HTTPException(status_code=503, detail=f"{route.upstream.name} unavailable")
+
+    # The ETag was not cached here, but the client may still hold the current version
+    etag = upstream_response.headers.get("etag")
+    if conditional and upstream_response.status_code == 200 and etag and etag_matches(if_none_match, etag):
+        await upstream_response.aclose()
+        return not_modified(etag)
+
+    # Bodies are relayed as raw bytes, so content-encoding and content-length stay valid
+    return StreamingResponse(
+        upstream_response.aiter_raw(),
+        status_code=upstream_response.status_code,
+        headers=forward_response_headers(upstream_response),
+        background=BackgroundTask(upstream_response.aclose)
+    )
@@ -0,0 +1,266 @@
+import json
+import math
+import uuid
+from typing import Optional, Iterable, List, Tuple, Union, Callable
+import orjson
+from starlette.types import ASGIApp, Scope, Receive, Send, Message
+from starlette.routing import Match
+from starlette.datastructures import Headers
+
+from config import settings
+from redis_client import redis_client
+from auth import token_claims
+from proxy import ROUTES
+
+# Token bucket charged `cost` tokens, plus an optional concurrency lease, decided in a single
+# round trip. Leases are scored by acquisition time so ones that were never released age out.
+RATE_LIMIT_SCRIPT = redis_client.register_script("""
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local max_concurrent = tonumber(ARGV[3])
+local lease_ttl = tonumber(ARGV[5])
+local cost = tonumber(ARGV[6])
+
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(bucket[1]) or burst
+local ts = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+
+if tokens < cost then
+    return {0, tostring((cost - tokens) / rate), 'rate'}
+end
+
+if max_concurrent > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', now - lease_ttl)
+    if redis.call('ZCARD', KEYS[2]) >= max_concurrent then
+        return {0, '1', 'concurrency'}
+    end
+    redis.call('ZADD', KEYS[2], now, ARGV[4])
+    redis.call('EXPIRE', KEYS[2], lease_ttl)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens - cost, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {1, '0', ''}
+""")
+
+# Carries the scrape concurrency lease to scraper_service, which hands it to the jobs it queues.
+# A worker releases it once the last of those jobs finishes; the set of their job ids is
+# LEASE_JOBS_KEY, shared with scraper_service.
+CONCURRENCY_LEASE_HEADER = b"x-concurrency-lease"
+LEASE_JOBS_KEY = "concurrency_jobs:{lease_id}"
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+def batch_cost(body: bytes, content_type: str) -> int:
+    # One token per distinct IDNO; a body the scraper will reject costs a single token
+    if content_type.split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+        return max(1, len({line.strip() for line in body.splitlines() if line.strip()}))
+    try:
+        batch = orjson.loads(body)
+        idnos = batch.get("idnos", []) if isinstance(batch, dict) else batch
+        return max(1, len({str(idno) for idno in idnos}))
+    except (orjson.JSONDecodeError, AttributeError, TypeError):
+        return 1
+
+class RateLimitPolicy:
+    def __init__(
+        self,
+        name: str,
+        path_prefix: Union[str, Tuple[str, ...]],
+        per_minute: float,
+        burst: int,
+        methods: Optional[Iterable[str]] = None,
+        per_user: bool = True,
+        max_concurrent: int = 0,
+        concurrency_group: Optional[str] = None,
+        cost: Optional[Callable[[bytes, str], int]] = None
+    ):
+        self.name = name
+        self.path_prefix = path_prefix
+        self.rate = per_minute / 60
+        self.burst = burst
+        self.methods = set(methods) if methods else None
+        # Unauthenticated routes are always keyed by client IP
+        self.per_user = per_user
+        self.max_concurrent = max_concurrent
+        # Policies in the same group share one concurrency quota
+        self.concurrency_group = concurrency_group or name
+        # Charges by request body instead of one token per request
+        self.cost = cost
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.methods and method not in self.methods:
+            return False
+        return path.startswith(self.path_prefix)
+
+# First matching policy wins
+POLICIES = [
+    RateLimitPolicy(
+        "login", "/auth/login",
+        settings.RATE_LIMIT_LOGIN_PER_MINUTE, settings.RATE_LIMIT_LOGIN_BURST,
+        methods={"POST"}, per_user=False
+    ),
+    RateLimitPolicy(
+        "register", "/auth/register",
+        settings.RATE_LIMIT_REGISTER_PER_MINUTE, settings.RATE_LIMIT_REGISTER_BURST,
+        methods={"POST"}, per_user=False
+    ),
+    RateLimitPolicy(
+        "batch", "/scrape/batch",
+        settings.RATE_LIMIT_BATCH_PER_MINUTE, settings.RATE_LIMIT_BATCH_BURST,
+        methods={"POST"}, max_concurrent=settings.RATE_LIMIT_SCRAPE_CONCURRENCY,
+        concurrency_group="scrape", cost=batch_cost
+    ),
+    RateLimitPolicy(
+        "scrape", "/scrape/",
+        settings.RATE_LIMIT_SCRAPE_PER_MINUTE, settings.RATE_LIMIT_SCRAPE_BURST,
+        methods={"POST"}, max_concurrent=settings.RATE_LIMIT_SCRAPE_CONCURRENCY
+    ),
+    RateLimitPolicy(
+        "default", tuple(route.prefix for route in ROUTES),
+        settings.RATE_LIMIT_DEFAULT_PER_MINUTE, settings.RATE_LIMIT_DEFAULT_BURST
+    ),
+]
+
+def client_identity(scope: Scope, headers: Headers, per_user: bool) -> str:
+    # Only a correctly signed token may claim a user's bucket
+    payload = token_claims(headers.get("authorization", "")) if per_user else None
+    if payload:
+        user_id = payload.get("user_id") or payload.get("sub")
+        if user_id is not None:
+            return f"user:{user_id}"
+
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, policies: List[RateLimitPolicy] = POLICIES):
+        self.app = app
+        self.policies = policies
+
+    def match(self, method: str, path: str) -> Optional[RateLimitPolicy]:
+        return next((policy for policy in self.policies if policy.matches(method, path)), None)
+
+    def concurrency_key(self, policy: RateLimitPolicy, identity: str) -> str:
+        return f"concurrency:{policy.concurrency_group}:{identity}"
+
+    async def check(self, policy: RateLimitPolicy, identity: str, lease_id: str, cost: int) -> Tuple[bool, float, str]:
+        try:
+            allowed, retry_after, reason = await RATE_LIMIT_SCRIPT(
+                keys=[f"ratelimit:{policy.name}:{identity}", self.concurrency_key(policy, identity)],
+                args=[policy.rate, policy.burst, policy.max_concurrent, lease_id, settings.RATE_LIMIT_LEASE_TTL, cost]
+            )
+            return bool(allowed), float(retry_after), reason
+        except Exception as e:
+            # Fail open: an unavailable limiter should not take the API down with it
+            print(f"Error checking rate limit: {str(e)}")
+            return True, 0.0, ""
+
+    async def release(self, policy: RateLimitPolicy, identity: str, lease_id: str):
+        try:
+            # A lease handed to queued scrape jobs is released by the worker that finishes the last of them
+            if await redis_client.exists(LEASE_JOBS_KEY.format(lease_id=lease_id)):
+                return
+            await redis_client.zrem(self.concurrency_key(policy, identity), lease_id)
+        except Exception as e:
+            print(f"Error releasing concurrency lease: {str(e)}")
+
+    def label_route(self, scope: Scope):
+        # Rejected requests never reach the router, so resolve the route here for the metrics label
+        partial = None
+        for route in scope["app"].router.routes:
+            match, _ = route.matches(scope)
+            if match == Match.FULL:
+                scope["route"] = route
+                return
+            if match == Match.PARTIAL and partial is None:
+                partial = route
+        if partial is not None:
+            scope["route"] = partial
+
+    async def reject(self, scope: Scope, send: Send, status: int, detail: str, retry_after: Optional[float] = None):
+        self.label_route(scope)
+        body = json.dumps({"detail": detail}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode())
+        ]
+        if retry_after is not None:
+            headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode()))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # Only the gateway may hand out concurrency leases
+        scope["headers"] = [(key, value) for key, value in scope["headers"] if key != CONCURRENCY_LEASE_HEADER]
+        if not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        policy = self.match(scope["method"], scope["path"])
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        cost = 1
+        if policy.cost is not None:
+            # Batch bodies are read up front to count their IDNOs, then replayed to the proxy
+            body = await read_body(receive)
+            if body is None:
+                return
+            cost = policy.cost(body, headers.get("content-type", ""))
+            receive = replay_body(body, receive)
+            if cost > policy.burst:
+                await self.reject(scope, send, 413, f"Batch of {cost} IDNOs exceeds the limit of {policy.burst} per request")
+                return
+
+        identity = client_identity(scope, headers, policy.per_user)
+        lease_id = uuid.uuid4().hex
+        allowed, retry_after, reason = await self.check(policy, identity, lease_id, cost)
+        if not allowed:
+            detail = f"Too many concurrent {policy.concurrency_group} requests" if reason == "concurrency" else "Rate limit exceeded"
+            await self.reject(scope, send, 429, detail, retry_after)
+            return
+
+        if not policy.max_concurrent:
+            await self.app(scope, receive, send)
+            return
+
+        lease = f"{self.concurrency_key(policy, identity)} {lease_id}"
+        scope["headers"].append((CONCURRENCY_LEASE_HEADER, lease.encode()))
+        # Held at least until the (possibly streamed) response has been sent, and past that
+        # for as long as scrape jobs queued by the request are still pending
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            await self.release(policy, identity, lease_id)
+
+async def read_body(receive: Receive) -> Optional[bytes]:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+def replay_body(body: bytes, receive: Receive) -> Receive:
+    replayed = False
+
+    async def receive_replayed() -> Message:
+        nonlocal replayed
+        if replayed:
+            # Later calls only wait for the client to disconnect
+            return await receive()
+        replayed = True
+        return {"type": "http.request", "body": body, "more_body": False}
+    return receive_replayed
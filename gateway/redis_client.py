@@ -0,0 +1,8 @@
+import redis.asyncio as redis
+from config import settings
+
+redis_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=True
+)
@@ -0,0 +1,212 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import Optional, Dict, Any, List
+import httpx
+
+from config import settings
+from http_client import get_http_client
+from metrics import UPSTREAM_DURATION
+
+# Gateway errors mean the upstream (not the request) is unhealthy; 503 is left alone
+# because services also use it for deliberate load shedding
+FAILURE_STATUS_CODES = {502, 504}
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+class CircuitOpenError(httpx.RequestError):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trial_in_flight = False
+        self.rejected = 0
+
+    def before_call(self, name: str):
+        if self.state == CIRCUIT_OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"{name} circuit is open")
+            self.state = CIRCUIT_HALF_OPEN
+
+        # Half-open lets a single trial call through; its outcome closes or reopens the circuit
+        if self.state == CIRCUIT_HALF_OPEN:
+            if self.trial_in_flight:
+                self.rejected += 1
+                raise CircuitOpenError(f"{name} circuit is half-open")
+            self.trial_in_flight = True
+
+    def record_success(self):
+        self.state = CIRCUIT_CLOSED
+        self.failures = 0
+        self.trial_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        self.trial_in_flight = False
+        if self.state == CIRCUIT_HALF_OPEN or self.failures >= self.failure_threshold:
+            self.state = CIRCUIT_OPEN
+            self.opened_at = time.monotonic()
+
+    def release(self):
+        # A call abandoned midway (e.g. a cancelled hedge) says nothing about upstream health
+        self.trial_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "open": self.state != CIRCUIT_CLOSED,
+            "consecutive_failures": self.failures,
+            "rejected": self.rejected
+        }
+
+class LatencyWindow:
+    def __init__(self, size: int = 200, min_samples: int = 20):
+        self.samples = deque(maxlen=size)
+        self.min_samples = min_samples
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, percent: float) -> Optional[float]:
+        if len(self.samples) < self.min_samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * percent / 100))]
+
+def retry_delay(attempt: int) -> float:
+    # Full jitter keeps retries from many callers from arriving in lockstep
+    delay = min(settings.UPSTREAM_RETRY_MAX_DELAY, settings.UPSTREAM_RETRY_BASE_DELAY * (2 ** attempt))
+    return random.uniform(0, delay)
+
+class Upstream:
+    def __init__(self, name: str):
+        self.name = name
+        self.breaker = CircuitBreaker(settings.CIRCUIT_FAILURE_THRESHOLD, settings.CIRCUIT_RESET_TIMEOUT)
+        self.latency = LatencyWindow()
+
+        self.retried = 0
+        self.hedged = 0
+
+    def hedge_delay(self) -> Optional[float]:
+        if not settings.HEDGE_ENABLED:
+            return None
+        delay = self.latency.percentile(settings.HEDGE_PERCENTILE)
+        return None if delay is None else max(delay, settings.HEDGE_MIN_DELAY)
+
+    async def _attempt(self, request: httpx.Request, stream: bool) -> httpx.Response:
+        self.breaker.before_call(self.name)
+        started = time.monotonic()
+        try:
+            response = await get_http_client().send(request, stream=stream)
+        except httpx.RequestError:
+            self.breaker.record_failure()
+            UPSTREAM_DURATION.labels(self.name, "error").observe(time.monotonic() - started)
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+
+        elapsed = time.monotonic() - started
+        UPSTREAM_DURATION.labels(self.name, f"{response.status_code // 100}xx").observe(elapsed)
+        if response.status_code in FAILURE_STATUS_CODES:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+            self.latency.observe(elapsed)
+        return response
+
+    async def _hedged(self, request: httpx.Request, stream: bool) -> httpx.Response:
+        primary = asyncio.create_task(self._attempt(request, stream))
+        delay = self.hedge_delay()
+        if delay is None:
+            return await primary
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            return primary.result()
+
+        # The primary is slower than usual: race a second copy and keep whichever answers well first
+        self.hedged += 1
+        pending = {primary, asyncio.create_task(self._attempt(request, stream))}
+        finished: List[asyncio.Task] = []
+        winner = None
+        try:
+            while pending and winner is None:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    finished.append(task)
+                    if winner is None and task.exception() is None \
+                            and task.result().status_code not in FAILURE_STATUS_CODES:
+                        winner = task
+            winner = winner or finished[-1]
+            return winner.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            for task in finished:
+                if task is not winner and task.exception() is None:
+                    await task.result().aclose()
+
+    async def send(
+        self,
+        request: httpx.Request,
+        idempotent: bool = False,
+        hedge: bool = False,
+        stream: bool = False
+    ) -> httpx.Response:
+        # Only idempotent requests with a replayable body may be retried or hedged
+        attempts = 1 + (settings.UPSTREAM_RETRIES if idempotent else 0)
+        for attempt in range(attempts):
+            last = attempt == attempts - 1
+            try:
+                if hedge and idempotent:
+                    response = await self._hedged(request, stream)
+                else:
+                    response = await self._attempt(request, stream)
+            except CircuitOpenError:
+                raise
+            except httpx.RequestError:
+                if last:
+                    raise
+            else:
+                if last or response.status_code not in FAILURE_STATUS_CODES:
+                    return response
+                await response.aclose()
+
+            self.retried += 1
+            await asyncio.sleep(retry_delay(attempt))
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        idempotent: bool = False,
+        hedge: bool = False,
+        **kwargs
+    ) -> httpx.Response:
+        request = get_http_client().build_request(method, url, **kwargs)
+        return await self.send(request, idempotent=idempotent, hedge=hedge)
+
+    def stats(self) -> Dict[str, Any]:
+        p95 = self.latency.percentile(95)
+        return {
+            **self.breaker.stats(),
+            "retried": self.retried,
+            "hedged": self.hedged,
+            "p95_seconds": round(p95, 4) if p95 is not None else None
+        }
+
+app_service_upstream = Upstream("App service")
+
+def circuit_stats() -> Dict[str, Any]:
+    return {app_service_upstream.name: app_service_upstream.stats()}
@@ -0,0 +1,173 @@
+import argparse
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Dict, Any, Tuple, Optional
+from sqlalchemy import select, delete, exists, or_, func
+from sqlalchemy.orm import aliased
+
+from database import Base, engine, async_engine, AsyncSessionLocal
+from models import SourceData, TransformedData, RawPage
+from extraction import extraction_rules
+from parsers import html_parser
+from raw_pages import source_html
+from redis_client import redis_client, cache_company_data_many
+from services import transformed_data_upsert
+from company_cache import record_age
+
+# Usage: python backfill.py [--outdated-only] [--batch-size 500] [--workers 4] [--restart]
+# Re-runs the extraction rules over stored source_data pages and upserts transformed_data,
+# resuming after the last checkpointed source id unless --restart or --since-id is given
+
+CHECKPOINT_KEY = "backfill:checkpoint:{name}"
+
+def transform_rows(rows: List[Tuple[int, str, Optional[str], Optional[bytes]]]) -> List[Optional[Dict[str, Any]]]:
+    # Runs in a worker process, so decompression happens there too; one call per batch
+    # keeps pickling overhead per page low
+    results = []
+    for source_id, idno, raw_html, compressed in rows:
+        try:
+            results.append(extraction_rules.extract(html_parser, source_html(raw_html, compressed)))
+        except Exception as e:
+            print(f"Error transforming source id {source_id} (IDNO {idno}): {str(e)}")
+            results.append(None)
+    return results
+
+def source_query(since_id: int, outdated_only: bool):
+    newer = aliased(SourceData)
+    # Only the newest page of each IDNO is allowed to replace its cached entry
+    is_latest = ~exists().where(newer.idno == SourceData.idno, newer.id > SourceData.id)
+
+    query = (
+        select(
+            SourceData.id, SourceData.idno,
+            # Unchanged refetches only move last_fetched_at, and rows keep the time their page was last seen
+            func.coalesce(SourceData.last_fetched_at, SourceData.created_at).label("created_at"),
+            is_latest.label("latest"),
+            SourceData.raw_html, RawPage.compressed_html
+        )
+        .outerjoin(RawPage, RawPage.content_hash == SourceData.content_hash)
+        .where(SourceData.id > since_id)
+        .order_by(SourceData.id)
+    )
+    if outdated_only:
+        query = query.outerjoin(TransformedData, TransformedData.source_id == SourceData.id).where(or_(
+            TransformedData.id.is_(None),
+            TransformedData.rules_version.is_(None),
+            TransformedData.rules_version < extraction_rules.version
+        ))
+    return query
+
+async def write_batch(
+    rows: List[Tuple[int, str, Any, bool]],
+    results: List[Optional[Dict[str, Any]]],
+    checkpoint_key: str,
+    refresh_cache: bool
+) -> int:
+    values = []
+    latest: Dict[str, Dict[str, Any]] = {}
+    for (source_id, idno, created_at, is_latest), fields in zip(rows, results):
+        if fields is None:
+            continue
+        # Rows keep the time the page was fetched, not the time of the backfill
+        company_data = {
+            "idno": idno,
+            **fields,
+            "rules_version": extraction_rules.version,
+            "created_at": created_at
+        }
+        values.append({"source_id": source_id, **company_data})
+        if is_latest:
+            latest[idno] = company_data
+
+    if values:
+        async with AsyncSessionLocal() as db:
+            await db.execute(transformed_data_upsert(), values)
+            # Rows from before source_id was recorded are never replaced by the upsert and could still
+            # be read as an IDNO's latest data, so they go once its newest page has been re-transformed.
+            # Rows detached by compact_pages.py are kept as history.
+            if latest:
+                await db.execute(delete(TransformedData).where(
+                    TransformedData.idno.in_(list(latest)),
+                    TransformedData.source_id.is_(None),
+                    TransformedData.source_deleted_at.is_(None)
+                ))
+            await db.commit()
+
+    if refresh_cache and latest:
+        await cache_company_data_many(
+            latest,
+            ages={idno: record_age(data["created_at"]) for idno, data in latest.items()}
+        )
+
+    # Only advanced once the batch is committed, so a crash re-runs at most the batches in flight
+    await redis_client.set(checkpoint_key, rows[-1][0])
+    return len(values)
+
+async def backfill(args):
+    checkpoint_key = CHECKPOINT_KEY.format(name=args.name)
+    since_id = args.since_id
+    if since_id is None:
+        checkpoint = None if args.restart else await redis_client.get(checkpoint_key)
+        since_id = int(checkpoint) if checkpoint else 0
+    print(f"Backfilling from source id {since_id} with rules version {extraction_rules.version}")
+
+    loop = asyncio.get_running_loop()
+    executor = ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn"))
+    # Batches in flight are bounded, so memory stays flat however many pages there are
+    in_flight: deque = deque()
+    processed = written = 0
+    started = time.monotonic()
+
+    async def drain_one():
+        nonlocal processed, written
+        rows, future = in_flight.popleft()
+        written += await write_batch(rows, await future, checkpoint_key, not args.no_cache)
+        processed += len(rows)
+        rate = processed / max(time.monotonic() - started, 1e-6)
+        print(f"Up to source id {rows[-1][0]}: {processed} pages, {written} rows written, {rate:.0f} pages/s")
+
+    try:
+        async with async_engine.connect() as conn:
+            # yield_per streams through a server-side cursor instead of loading the result set
+            result = await conn.stream(
+                source_query(since_id, args.outdated_only).execution_options(yield_per=args.batch_size)
+            )
+            async for partition in result.partitions():
+                rows = [(row.id, row.idno, row.created_at, row.latest) for row in partition]
+                pages = [(row.id, row.idno, row.raw_html, row.compressed_html) for row in partition]
+                in_flight.append((rows, loop.run_in_executor(executor, transform_rows, pages)))
+                if len(in_flight) >= args.workers * 2:
+                    await drain_one()
+
+            while in_flight:
+                await drain_one()
+    finally:
+        executor.shutdown(cancel_futures=True)
+
+    print(f"Backfill finished: {processed} pages, {written} rows written in {time.monotonic() - started:.1f}s")
+
+async def main():
+    parser = argparse.ArgumentParser(description="Re-transform stored source_data pages into transformed_data")
+    parser.add_argument("--batch-size", type=int, default=500, help="Pages per cursor batch and worker task")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Transform processes")
+    parser.add_argument("--outdated-only", action="store_true",
+                        help="Skip pages already transformed with the current rules version")
+    parser.add_argument("--no-cache", action="store_true", help="Do not refresh the Redis company cache")
+    parser.add_argument("--name", default="default", help="Checkpoint name, for running separate backfills")
+    parser.add_argument("--since-id", type=int, help="Start after this source id, ignoring the checkpoint")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the beginning")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        await backfill(args)
+    finally:
+        await redis_client.aclose()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,139 @@
+import json
+import asyncio
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
+from fastapi import Request, HTTPException
+
+from config import settings
+from redis_client import pubsub_client, get_cached_company_data_many, get_scraping_statuses
+from job_queue import submit_batch, JOB_QUEUED, JOB_COMPLETED, JOB_FAILED
+from job_events import idno_channel
+from services import get_cached_result
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/jsonl", "application/ndjson")
+
+BATCH_TERMINAL_STATUSES = {JOB_COMPLETED, JOB_FAILED}
+
+def parse_idno_line(line: str) -> Optional[str]:
+    line = line.strip()
+    if not line:
+        return None
+    if line[0] in "{\"":
+        value = json.loads(line)
+        return str(value["idno"] if isinstance(value, dict) else value)
+    return line
+
+async def parse_batch_request(request: Request) -> Tuple[List[str], bool]:
+    # Accepts {"idnos": [...], "force_refresh": bool}, a bare JSON list, or one IDNO per NDJSON line
+    force_refresh = False
+    idnos: List[str] = []
+
+    try:
+        if request.headers.get("content-type", "").split(";")[0].strip() in NDJSON_CONTENT_TYPES:
+            buffer = ""
+            async for chunk in request.stream():
+                buffer += chunk.decode()
+                *lines, buffer = buffer.split("\n")
+                idnos.extend(idno for idno in map(parse_idno_line, lines) if idno)
+                if len(idnos) > settings.JOB_BATCH_MAX_SIZE:
+                    break
+            idno = parse_idno_line(buffer)
+            if idno:
+                idnos.append(idno)
+        else:
+            body = await request.json()
+            if isinstance(body, dict):
+                force_refresh = bool(body.get("force_refresh", False))
+                body = body.get("idnos", [])
+            idnos = [str(idno) for idno in body]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid batch request body")
+
+    if len(idnos) > settings.JOB_BATCH_MAX_SIZE:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {settings.JOB_BATCH_MAX_SIZE} IDNOs")
+
+    # Duplicates would only attach to the same job twice
+    return list(dict.fromkeys(idnos)), force_refresh
+
+def result_line(
+    idno: str,
+    status: str,
+    cached: bool = False,
+    job_id: Optional[str] = None,
+    data: Optional[Dict[str, Any]] = None
+) -> str:
+    return json.dumps({
+        "idno": idno,
+        "status": status,
+        "cached": cached,
+        "job_id": job_id,
+        "data": data
+    }, default=str) + "\n"
+
+async def stream_batch_results(
+    idnos: List[str],
+    force_refresh: bool,
+    wait: float,
+    lease: Optional[str] = None
+) -> AsyncIterator[str]:
+    cached = {} if force_refresh else await get_cached_company_data_many(idnos)
+    for idno in idnos:
+        if idno in cached:
+            yield result_line(idno, JOB_COMPLETED, cached=True, data=cached[idno])
+
+    misses = [idno for idno in idnos if idno not in cached]
+    if not misses:
+        return
+
+    pubsub = pubsub_client.pubsub()
+    try:
+        # Subscribe before queueing so no completion event can be missed
+        channels = [idno_channel(idno) for idno in misses]
+        for start in range(0, len(channels), 500):
+            await pubsub.subscribe(*channels[start:start + 500])
+
+        _, assignments, queued = await submit_batch(misses, lease)
+        statuses = {idno: JOB_QUEUED for idno in misses}
+        pending = set(misses)
+
+        # IDNOs attached to jobs already in flight may have finished before we subscribed
+        attached = [idno for idno in misses if idno not in queued]
+        for idno, status in (await get_scraping_statuses(attached)).items():
+            statuses[idno] = status
+            if status in BATCH_TERMINAL_STATUSES:
+                pending.discard(idno)
+                data = await get_cached_result(idno, use_local=False) if status == JOB_COMPLETED else None
+                yield result_line(idno, status, job_id=assignments[idno], data=data)
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + min(wait, settings.JOB_BATCH_MAX_WAIT)
+        while pending:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True,
+                timeout=min(remaining, settings.JOB_SSE_HEARTBEAT)
+            )
+            if message is None:
+                # Blank line keeps proxies from timing out the stream; NDJSON readers skip it
+                yield "\n"
+                continue
+
+            event = json.loads(message["data"])
+            idno = event["idno"]
+            if idno not in pending:
+                continue
+
+            statuses[idno] = event["status"]
+            if event["status"] in BATCH_TERMINAL_STATUSES:
+                pending.discard(idno)
+                data = await get_cached_result(idno, use_local=False) if event["status"] == JOB_COMPLETED else None
+                yield result_line(idno, event["status"], job_id=assignments[idno], data=data)
+
+        # Whatever is still running can be followed through /scrape/jobs/{job_id}
+        for idno in misses:
+            if idno in pending:
+                yield result_line(idno, statuses[idno], job_id=assignments[idno])
+    finally:
+        await pubsub.aclose()
@@ -0,0 +1,118 @@
+import argparse
+import json
+import time
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, List, Tuple
+from fastapi.responses import JSONResponse, ORJSONResponse
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import TransformedData
+from schemas import CompanyData, ScrapeResponse
+from codec import CODECS, decode_value
+from company_cache import record_data
+
+# Usage: python benchmark_codecs.py --limit 200 --number 2000
+# Compares encode/decode cost and size of the Redis value codecs with the stdlib JSON they replaced,
+# for company data and token sessions, and JSONResponse with ORJSONResponse for /scrape/ responses
+
+SAMPLE_COMPANY = {
+    "idno": "1003600012345",
+    "company_name": "Exemplu Comert SRL",
+    "address": "mun. Chișinău, str. Ștefan cel Mare și Sfînt 1, of. 12",
+    "status": "Activ",
+    "registration_date": date(2004, 3, 17),
+    "activity_codes": ["46.90", "47.19", "49.41", "52.10", "68.20", "70.22", "73.11", "82.99"],
+    "directors": ["Ion Popescu", "Maria Rusu"],
+    "rules_version": 2,
+    "created_at": datetime(2026, 10, 1, 12, 30, 45, 123456)
+}
+
+# Same shape as the session cache_user_session writes
+SAMPLE_SESSION = {
+    "user_id": 4821,
+    "username": "analyst@example.com",
+    "token": "eyJhbGciOiJSUzI1NiIsInR5cCI6IkpXVCJ9." + "x" * 160 + "." + "y" * 342,
+    "login_time": datetime(2026, 10, 1, 12, 30, 45, 123456, tzinfo=timezone.utc)
+}
+
+def load_companies(limit: int) -> List[Dict[str, Any]]:
+    try:
+        with SessionLocal() as db:
+            records = db.execute(
+                select(TransformedData).order_by(TransformedData.id.desc()).limit(limit)
+            ).scalars().all()
+            return [record_data(record) for record in records]
+    except Exception as e:
+        print(f"Could not load transformed_data, using the built-in sample: {str(e)}")
+        return []
+
+def measure(function: Callable[[Any], Any], values: List[Any], number: int) -> float:
+    # Best of three runs in CPU time, as microseconds per call
+    best = float("inf")
+    for _ in range(3):
+        started = time.process_time()
+        for index in range(number):
+            function(values[index % len(values)])
+        best = min(best, time.process_time() - started)
+    return best / number * 1_000_000
+
+def stdlib_encode(value: Any) -> bytes:
+    return json.dumps(value, default=str).encode()
+
+def codec_cases() -> List[Tuple[str, Callable, Callable]]:
+    cases = [("stdlib json", stdlib_encode, json.loads)]
+    for name, codec in CODECS.items():
+        if codec.version is None:
+            cases.append((f"{name} (orjson)", codec.encode, codec.decode))
+        else:
+            versioned = bytes((codec.version,))
+            cases.append((f"{name} (v{codec.version})", lambda value, codec=codec, versioned=versioned: versioned + codec.encode(value), decode_value))
+    return cases
+
+def benchmark_payload(label: str, payloads: List[Dict[str, Any]], number: int):
+    print(f"{label}: {len(payloads)} payload(s), {number} calls per measurement")
+    print(f"{'codec':<16} {'encode us':>10} {'decode us':>10} {'bytes':>7} {'speedup':>8}")
+
+    baseline = None
+    for name, encode, decode in codec_cases():
+        encoded = [encode(payload) for payload in payloads]
+        encode_time = measure(encode, payloads, number)
+        decode_time = measure(decode, encoded, number)
+        size = sum(len(value) for value in encoded) / len(encoded)
+        total = encode_time + decode_time
+        baseline = baseline or total
+        print(f"{name:<16} {encode_time:>10.2f} {decode_time:>10.2f} {size:>7.0f} {baseline / total:>7.1f}x")
+    print()
+
+def benchmark_responses(companies: List[Dict[str, Any]], number: int):
+    # What FastAPI renders after validating the response model
+    contents = [
+        ScrapeResponse(
+            success=True, message="Data retrieved from cache", data=CompanyData(**company), cached=True
+        ).model_dump(mode="json")
+        for company in companies
+    ]
+    print(f"/scrape/ response rendering, {number} calls per measurement")
+    print(f"{'response class':<16} {'render us':>10} {'speedup':>8}")
+
+    baseline = None
+    for response_class in (JSONResponse, ORJSONResponse):
+        render_time = measure(lambda content: response_class(content).body, contents, number)
+        baseline = baseline or render_time
+        print(f"{response_class.__name__:<16} {render_time:>10.2f} {baseline / render_time:>7.1f}x")
+    print()
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Redis value codecs and JSON response classes")
+    parser.add_argument("--limit", type=int, default=200, help="Most recent transformed_data rows to use as company payloads")
+    parser.add_argument("--number", type=int, default=2000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    companies = load_companies(args.limit) or [SAMPLE_COMPANY]
+    benchmark_payload("Company data", companies, args.number)
+    benchmark_payload("Token session", [SAMPLE_SESSION], args.number)
+    benchmark_responses(companies, args.number)
+
+if __name__ == "__main__":
+    main()
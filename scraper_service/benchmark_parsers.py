@@ -0,0 +1,109 @@
+import argparse
+import time
+from datetime import date
+from typing import List, Tuple
+from sqlalchemy import select
+
+from database import SessionLocal
+from models import SourceData, RawPage
+from parsers import PARSERS, SoupParser, get_parser
+from extraction import extraction_rules
+from raw_pages import source_html
+
+# Usage: python benchmark_parsers.py --limit 500 --repeat 3
+# Runs the extraction rules with each parser backend over stored pages and compares
+# CPU time and extracted fields with html.parser. Every backend is first checked against the
+# built-in sample pages, whose expected fields cover label edge cases stored pages may not.
+
+BASELINE = SoupParser.name
+
+# (description, html, fields expected from every backend)
+SAMPLE_PAGES = [
+    (
+        "empty value followed by another label",
+        "<html><body><h1>Exemplu Comert SRL</h1><table>"
+        "<tr><td>Statut</td><td></td></tr>"
+        "<tr><td>Data înregistrării</td><td>17.03.2004</td></tr>"
+        "<tr><td>Adresa</td><td>mun. Chișinău, str. Ștefan cel Mare 1</td></tr>"
+        "<tr><td>Administrator</td><td></td></tr>"
+        "<tr><td>CAEM</td><td>46.90, 47.19</td></tr>"
+        "</table></body></html>",
+        {
+            "company_name": "Exemplu Comert SRL",
+            "address": "mun. Chișinău, str. Ștefan cel Mare 1",
+            "status": None,
+            "registration_date": date(2004, 3, 17),
+            "activity_codes": ["46.90", "47.19"],
+            "directors": []
+        }
+    ),
+]
+
+def load_pages(limit: int) -> List[Tuple[str, str]]:
+    with SessionLocal() as db:
+        rows = db.execute(
+            select(SourceData.idno, SourceData.raw_html, RawPage.compressed_html)
+            .outerjoin(RawPage, RawPage.content_hash == SourceData.content_hash)
+            .order_by(SourceData.id.desc())
+            .limit(limit)
+        ).all()
+    return [(idno, source_html(raw_html, compressed)) for idno, raw_html, compressed in rows]
+
+def run_parser(name: str, pages: List[Tuple[str, str]], repeat: int):
+    parser = get_parser(name)
+    results = [extraction_rules.extract(parser, raw_html) for _, raw_html in pages]
+
+    # CPU time rather than wall time, so other load on the machine does not skew the numbers
+    started = time.process_time()
+    for _ in range(repeat):
+        for _, raw_html in pages:
+            extraction_rules.extract(parser, raw_html)
+    elapsed = time.process_time() - started
+    return elapsed / (repeat * len(pages)), results
+
+def check_samples(parser_names: List[str]) -> int:
+    failures = 0
+    for name in parser_names:
+        parser = get_parser(name)
+        for description, raw_html, expected in SAMPLE_PAGES:
+            result = extraction_rules.extract(parser, raw_html)
+            for field, value in expected.items():
+                if result[field] != value:
+                    failures += 1
+                    print(f"{name} fails sample '{description}' on {field}: {result[field]!r} != {value!r}")
+    print(f"Built-in samples: {len(SAMPLE_PAGES)} page(s), {failures} field mismatch(es)\n")
+    return failures
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark HTML parser backends on stored pages")
+    arg_parser.add_argument("--limit", type=int, default=200, help="Most recent source_data pages to use")
+    arg_parser.add_argument("--repeat", type=int, default=3, help="Passes over the pages per parser")
+    arg_parser.add_argument("--parsers", nargs="+", default=list(PARSERS), choices=list(PARSERS))
+    args = arg_parser.parse_args()
+
+    check_samples(list(dict.fromkeys([BASELINE, *args.parsers])))
+
+    pages = load_pages(args.limit)
+    if not pages:
+        print("No stored pages found in source_data")
+        return
+    average_kb = sum(len(raw_html) for _, raw_html in pages) / len(pages) / 1024
+    print(f"{len(pages)} pages, {average_kb:.1f} KiB on average, {args.repeat} passes\n")
+
+    runs = {name: run_parser(name, pages, args.repeat) for name in dict.fromkeys([BASELINE, *args.parsers])}
+    baseline_time, baseline = runs[BASELINE]
+
+    print(f"{'parser':<12} {'ms/page':>9} {'speedup':>8} {'pages differing':>16}")
+    for name, (per_page, results) in runs.items():
+        differing = sum(1 for ours, theirs in zip(results, baseline) if ours != theirs)
+        print(f"{name:<12} {per_page * 1000:>9.2f} {baseline_time / per_page:>7.1f}x {differing:>16}")
+
+    # Pages where a backend would store different fields than html.parser
+    for name, (_, results) in runs.items():
+        for (idno, _), ours, theirs in zip(pages, results, baseline):
+            for field in extraction_rules.field_names():
+                if ours[field] != theirs[field]:
+                    print(f"{name} differs for IDNO {idno} on {field}: {ours[field]!r} != {theirs[field]!r}")
+
+if __name__ == "__main__":
+    main()
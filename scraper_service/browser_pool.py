@@ -0,0 +1,204 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Any, List, Optional
+from selenium import webdriver
+
+from config import settings
+from metrics import BROWSER_POOL_WAIT, BROWSER_PAGE_DURATION
+
+class PooledBrowser:
+    def __init__(self, driver: webdriver.Chrome):
+        self.driver = driver
+        self.pages = 0
+        self.last_used = time.monotonic()
+
+class BrowserPool:
+    def __init__(
+        self,
+        size: int,
+        max_pages: int,
+        max_memory_mb: int,
+        acquire_timeout: float,
+        healthcheck_interval: float
+    ):
+        self.size = size
+        self.max_pages = max_pages
+        self.max_memory_mb = max_memory_mb
+        self.acquire_timeout = acquire_timeout
+        self.healthcheck_interval = healthcheck_interval
+
+        # Idle browsers are used LIFO so the warmest one stays in rotation
+        self._idle: List[PooledBrowser] = []
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._created = 0
+        self._waiting = 0
+        self._closed = False
+
+        self.recycled = 0
+
+    def _create_browser(self) -> PooledBrowser:
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless')
+        options.add_argument('--no-sandbox')
+        options.add_argument('--disable-dev-shm-usage')
+
+        driver = webdriver.Chrome(options=options)
+        driver.set_page_load_timeout(settings.BROWSER_PAGE_LOAD_TIMEOUT)
+        return PooledBrowser(driver)
+
+    def _discard(self, browser: PooledBrowser):
+        try:
+            browser.driver.quit()
+        except Exception as e:
+            print(f"Error closing browser: {str(e)}")
+
+        with self._available:
+            self._created -= 1
+            self.recycled += 1
+            self._available.notify()
+
+    def _is_healthy(self, browser: PooledBrowser) -> bool:
+        if time.monotonic() - browser.last_used < self.healthcheck_interval:
+            return True
+        try:
+            browser.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _memory_mb(self, browser: PooledBrowser) -> float:
+        try:
+            used = browser.driver.execute_script(
+                "return performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+            return (used or 0) / (1024 * 1024)
+        except Exception:
+            return 0.0
+
+    def _needs_recycle(self, browser: PooledBrowser) -> bool:
+        if browser.pages >= self.max_pages:
+            return True
+        return self.max_memory_mb > 0 and self._memory_mb(browser) >= self.max_memory_mb
+
+    def start(self):
+        # Warm the pool up front so the first scrapes don't pay Chrome startup
+        for _ in range(self.size):
+            with self._available:
+                if self._created >= self.size:
+                    return
+                self._created += 1
+            try:
+                browser = self._create_browser()
+            except Exception as e:
+                with self._available:
+                    self._created -= 1
+                    self._available.notify()
+                print(f"Error starting browser: {str(e)}")
+                continue
+            with self._available:
+                self._idle.append(browser)
+                self._available.notify()
+
+    def _checkout(self, deadline: float) -> Optional[PooledBrowser]:
+        # Returns an idle browser, or None when the caller may create a new one
+        with self._available:
+            self._waiting += 1
+            try:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed")
+                    if self._idle:
+                        return self._idle.pop()
+                    if self._created < self.size:
+                        self._created += 1
+                        return None
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("Timed out waiting for a browser")
+                    self._available.wait(remaining)
+            finally:
+                self._waiting -= 1
+
+    def acquire(self) -> PooledBrowser:
+        started = time.monotonic()
+        deadline = started + self.acquire_timeout
+
+        while True:
+            browser = self._checkout(deadline)
+            if browser is None:
+                try:
+                    browser = self._create_browser()
+                except Exception:
+                    with self._available:
+                        self._created -= 1
+                        self._available.notify()
+                    raise
+
+            if self._is_healthy(browser):
+                BROWSER_POOL_WAIT.observe(time.monotonic() - started)
+                return browser
+
+            self._discard(browser)
+
+    def release(self, browser: PooledBrowser, broken: bool = False):
+        browser.pages += 1
+        browser.last_used = time.monotonic()
+
+        if broken or self._closed or self._needs_recycle(browser):
+            self._discard(browser)
+            return
+
+        try:
+            # Drop the previous page so its DOM and scripts don't hold memory while idle
+            browser.driver.get("about:blank")
+        except Exception:
+            self._discard(browser)
+            return
+
+        with self._available:
+            self._idle.append(browser)
+            self._available.notify()
+
+    @contextmanager
+    def browser(self):
+        browser = self.acquire()
+        started = time.monotonic()
+        try:
+            yield browser.driver
+        except Exception:
+            BROWSER_PAGE_DURATION.observe(time.monotonic() - started)
+            self.release(browser, broken=True)
+            raise
+        BROWSER_PAGE_DURATION.observe(time.monotonic() - started)
+        self.release(browser)
+
+    def shutdown(self):
+        with self._available:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._available.notify_all()
+
+        for browser in idle:
+            self._discard(browser)
+
+    def stats(self) -> Dict[str, Any]:
+        idle = len(self._idle)
+        return {
+            "size": self.size,
+            "browsers": self._created,
+            "in_use": self._created - idle,
+            "idle": idle,
+            "waiting": self._waiting,
+            "recycled": self.recycled
+        }
+
+browser_pool = BrowserPool(
+    size=settings.BROWSER_POOL_SIZE,
+    max_pages=settings.BROWSER_MAX_PAGES,
+    max_memory_mb=settings.BROWSER_MAX_MEMORY_MB,
+    acquire_timeout=settings.BROWSER_ACQUIRE_TIMEOUT,
+    healthcheck_interval=settings.BROWSER_HEALTHCHECK_INTERVAL
+)
@@ -0,0 +1,60 @@
+from typing import Any, Optional
+import msgpack
+import orjson
+
+from config import settings
+
+def encode_default(value: Any):
+    # Dates and datetimes are stored as ISO strings, as the JSON cache always did
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+class JsonCodec:
+    name = "json"
+    # Unversioned, so services that predate the version byte can still read what it writes
+    version: Optional[int] = None
+
+    def encode(self, value: Any) -> bytes:
+        return orjson.dumps(value, default=encode_default)
+
+    def decode(self, data) -> Any:
+        return orjson.loads(data)
+
+class MsgpackCodec:
+    name = "msgpack"
+    version: Optional[int] = 1
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value, default=encode_default)
+
+    def decode(self, data) -> Any:
+        return msgpack.unpackb(data)
+
+class OrjsonCodec(JsonCodec):
+    # Same bytes as JsonCodec behind a version byte: more CPU-efficient than msgpack, but larger
+    name = "orjson"
+    version: Optional[int] = 2
+
+CODECS = {codec.name: codec for codec in (JsonCodec(), MsgpackCodec(), OrjsonCodec())}
+
+# Version bytes are all below 0x20, so they can never be mistaken for the first byte of a JSON document
+VERSIONED_CODECS = {codec.version: codec for codec in CODECS.values() if codec.version is not None}
+
+def get_codec(name: str):
+    if name not in CODECS:
+        raise ValueError(f"Unknown Redis value codec {name!r}, expected one of {', '.join(CODECS)}")
+    return CODECS[name]
+
+value_codec = get_codec(settings.REDIS_VALUE_CODEC)
+
+def encode_value(value: Any) -> bytes:
+    if value_codec.version is None:
+        return value_codec.encode(value)
+    return bytes((value_codec.version,)) + value_codec.encode(value)
+
+def decode_value(data: bytes) -> Any:
+    codec = VERSIONED_CODECS.get(data[0])
+    if codec is None:
+        return CODECS["json"].decode(data)
+    return codec.decode(data[1:])
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+from sqlalchemy import select, update, delete, exists, func, text
+
+from config import settings
+from database import Base, engine, async_engine, AsyncSessionLocal
+from models import SourceData, TransformedData, RawPage
+from raw_pages import content_hash, compress_html, store_raw_page
+
+# Usage: python compact_pages.py [--keep 3] [--min-age-days 30] [--vacuum]
+# 1. moves HTML stored inline in source_data (rows from before compression) into raw_pages
+# 2. deletes source_data rows beyond the newest --keep per IDNO once they are older than --min-age-days
+# 3. deletes raw_pages no source_data row points at any more
+
+async def compress_inline_pages(batch_size: int) -> int:
+    moved = 0
+    last_id = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            rows = (await db.execute(
+                select(SourceData.id, SourceData.raw_html)
+                .where(SourceData.raw_html.is_not(None), SourceData.id > last_id)
+                .order_by(SourceData.id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                return moved
+
+            for source_id, raw_html in rows:
+                page_hash = content_hash(raw_html)
+                compressed = await asyncio.to_thread(compress_html, raw_html)
+                await store_raw_page(db, page_hash, compressed, len(raw_html))
+                await db.execute(
+                    update(SourceData)
+                    .where(SourceData.id == source_id)
+                    .values(content_hash=page_hash, raw_html=None)
+                )
+            await db.commit()
+
+        moved += len(rows)
+        last_id = rows[-1].id
+        print(f"Compressed {moved} inline pages")
+
+async def delete_old_versions(keep: int, min_age_days: int, batch_size: int) -> int:
+    cutoff = datetime.now() - timedelta(days=min_age_days)
+    ranked = select(
+        SourceData.id,
+        SourceData.created_at,
+        func.row_number().over(partition_by=SourceData.idno, order_by=SourceData.id.desc()).label("version")
+    ).subquery()
+    expired = (
+        select(ranked.c.id)
+        .where(ranked.c.version > keep, ranked.c.created_at < cutoff)
+        .limit(batch_size)
+    )
+
+    deleted = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            ids = (await db.execute(expired)).scalars().all()
+            if not ids:
+                return deleted
+
+            # Transformed rows are history in their own right, so they outlive their page.
+            # The timestamp tells them apart from legacy rows, which never had a source_id.
+            await db.execute(
+                update(TransformedData)
+                .where(TransformedData.source_id.in_(ids))
+                .values(source_id=None, source_deleted_at=datetime.now())
+            )
+            await db.execute(delete(SourceData).where(SourceData.id.in_(ids)))
+            await db.commit()
+
+        deleted += len(ids)
+        print(f"Deleted {deleted} old page versions")
+
+async def delete_orphaned_pages(batch_size: int) -> int:
+    orphaned = (
+        select(RawPage.content_hash)
+        .where(~exists().where(SourceData.content_hash == RawPage.content_hash))
+        .limit(batch_size)
+    )
+
+    deleted = 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            hashes = (await db.execute(orphaned)).scalars().all()
+            if not hashes:
+                return deleted
+            await db.execute(delete(RawPage).where(RawPage.content_hash.in_(hashes)))
+            await db.commit()
+
+        deleted += len(hashes)
+        print(f"Deleted {deleted} unreferenced pages")
+
+async def vacuum():
+    # VACUUM cannot run inside a transaction
+    async with async_engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        for table in (SourceData.__tablename__, RawPage.__tablename__):
+            await conn.execute(text(f"VACUUM (ANALYZE) {table}"))
+
+async def main():
+    parser = argparse.ArgumentParser(description="Compress, expire and deduplicate stored raw pages")
+    parser.add_argument("--keep", type=int, default=settings.RAW_PAGE_KEEP_VERSIONS,
+                        help="Page versions to keep per IDNO")
+    parser.add_argument("--min-age-days", type=int, default=settings.RAW_PAGE_MIN_AGE_DAYS,
+                        help="Never delete versions younger than this")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM the tables afterwards (Postgres only)")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        moved = await compress_inline_pages(args.batch_size)
+        expired = await delete_old_versions(args.keep, args.min_age_days, args.batch_size)
+        orphaned = await delete_orphaned_pages(args.batch_size)
+        if args.vacuum and async_engine.dialect.name == "postgresql":
+            await vacuum()
+        print(f"Compaction finished: {moved} pages compressed, {expired} old versions and {orphaned} unreferenced pages deleted")
+    finally:
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
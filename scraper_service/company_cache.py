@@ -0,0 +1,164 @@
+import asyncio
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Optional, Dict, Any, Tuple, Set
+from sqlalchemy import select
+
+from config import settings
+from database import AsyncSessionLocal
+from models import TransformedData
+from extraction import extraction_rules
+from redis_client import pubsub_client, get_cached_company_data, cache_company_data
+from job_queue import submit_scrape
+from metrics import CACHE_REQUESTS
+
+class CompanyCache:
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    def get(self, idno: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        entry = self._entries.get(idno)
+        if entry is None:
+            return None
+
+        expires_at, stale_at, data = entry
+        if expires_at <= time.monotonic():
+            self._entries.pop(idno, None)
+            return None
+
+        self._entries.move_to_end(idno)
+        return data, stale_at
+
+    def set(self, idno: str, data: Dict[str, Any], stale_at: float, expires_at: float):
+        expires_at = min(expires_at, time.monotonic() + self.ttl_seconds)
+        self._entries[idno] = (expires_at, stale_at, data)
+        self._entries.move_to_end(idno)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def defer_refresh(self, idno: str, stale_at: float):
+        entry = self._entries.get(idno)
+        if entry is not None:
+            self._entries[idno] = (entry[0], stale_at, entry[2])
+
+    def invalidate(self, idno: str):
+        self._entries.pop(idno, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+company_cache = CompanyCache(
+    max_size=settings.LOCAL_COMPANY_CACHE_MAX_SIZE,
+    ttl_seconds=settings.LOCAL_COMPANY_CACHE_TTL
+)
+
+# Local entries are only trusted while the invalidation listener is subscribed
+invalidations_connected = False
+
+# Strong references, so refresh tasks are not garbage collected mid-flight
+refresh_tasks: Set[asyncio.Task] = set()
+
+async def submit_refresh(idno: str):
+    try:
+        await submit_scrape(idno)
+    except Exception as e:
+        print(f"Error refreshing cached data for IDNO {idno}: {str(e)}")
+
+def refresh_in_background(idno: str):
+    # submit_scrape coalesces with any job in flight, so all instances share one refresh;
+    # deferring locally keeps this instance from resubmitting on every stale hit
+    company_cache.defer_refresh(idno, time.monotonic() + settings.COMPANY_CACHE_REFRESH_RETRY)
+    task = asyncio.create_task(submit_refresh(idno))
+    refresh_tasks.add(task)
+    task.add_done_callback(refresh_tasks.discard)
+
+def record_data(record: TransformedData) -> Dict[str, Any]:
+    return {
+        column: getattr(record, column)
+        for column in ["idno", *extraction_rules.field_names(), "rules_version", "created_at"]
+    }
+
+def record_age(created_at: Optional[datetime]) -> float:
+    return (datetime.now() - created_at).total_seconds() if created_at else float("inf")
+
+async def load_company_data(idno: str) -> Optional[Tuple[Dict[str, Any], float]]:
+    # Read-through for companies scraped before but no longer (or not yet again) in Redis
+    try:
+        async with AsyncSessionLocal() as db:
+            record = (await db.execute(
+                select(TransformedData)
+                .where(TransformedData.idno == idno)
+                .order_by(TransformedData.created_at.desc())
+                .limit(1)
+            )).scalar_one_or_none()
+    except Exception as e:
+        CACHE_REQUESTS.labels("company_data_db", "error").inc()
+        print(f"Error loading stored data for IDNO {idno}: {str(e)}")
+        return None
+
+    if record is None:
+        CACHE_REQUESTS.labels("company_data_db", "miss").inc()
+        return None
+    age = record_age(record.created_at)
+    if age >= settings.COMPANY_DATA_MAX_AGE:
+        CACHE_REQUESTS.labels("company_data_db", "expired").inc()
+        return None
+
+    CACHE_REQUESTS.labels("company_data_db", "hit").inc()
+    company_data = record_data(record)
+    await cache_company_data(idno, company_data, age=age)
+    return company_data, age
+
+async def get_company_data(idno: str, use_local: bool = True) -> Optional[Dict[str, Any]]:
+    cached = company_cache.get(idno) if use_local and invalidations_connected else None
+    if cached is not None:
+        CACHE_REQUESTS.labels("company_data_local", "hit").inc()
+        data, stale_at = cached
+    else:
+        if invalidations_connected:
+            CACHE_REQUESTS.labels("company_data_local", "miss").inc()
+        entry = await get_cached_company_data(idno) or await load_company_data(idno)
+        if entry is None:
+            return None
+
+        data, age = entry
+        now = time.monotonic()
+        stale_at = now + settings.COMPANY_CACHE_SOFT_TTL - age
+        if invalidations_connected:
+            company_cache.set(idno, data, stale_at, now + settings.COMPANY_CACHE_HARD_TTL - age)
+
+    if stale_at <= time.monotonic():
+        # Past the soft TTL: answer with what we have and refresh behind the caller
+        CACHE_REQUESTS.labels("company_data", "stale").inc()
+        refresh_in_background(idno)
+    return data
+
+async def listen_for_invalidations():
+    global invalidations_connected
+
+    while True:
+        pubsub = pubsub_client.pubsub()
+        try:
+            await pubsub.subscribe(settings.COMPANY_CACHE_INVALIDATION_CHANNEL)
+            # Anything published while we were not subscribed was missed
+            company_cache.clear()
+            invalidations_connected = True
+
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    company_cache.invalidate(message["data"])
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Company cache invalidation listener disconnected: {str(e)}")
+            await asyncio.sleep(1)
+        finally:
+            invalidations_connected = False
+            company_cache.clear()
+            await pubsub.aclose()
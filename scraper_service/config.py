@@ -5,7 +5,90 @@ load_dotenv()
 
 class Settings:
     DATABASE_URL = os.getenv("DATABASE_URL")
+    DATABASE_ASYNC_URL = os.getenv("DATABASE_ASYNC_URL")
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500"))
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
-    
+    REDIS_MAX_CONNECTIONS: int = int(os.getenv("REDIS_MAX_CONNECTIONS", "50"))
+    REDIS_POOL_TIMEOUT: float = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))
+    REDIS_SOCKET_TIMEOUT: float = float(os.getenv("REDIS_SOCKET_TIMEOUT", "10"))
+    # "msgpack" (smallest) and "orjson" (cheapest to encode and decode) write versioned values; "json" writes
+    # plain JSON that services from before the codec switch can still read, for rolling upgrades.
+    # Every format is always readable.
+    REDIS_VALUE_CODEC: str = os.getenv("REDIS_VALUE_CODEC", "msgpack")
+
+    BROWSER_POOL_SIZE: int = int(os.getenv("BROWSER_POOL_SIZE", "2"))
+    BROWSER_POOL_WARM: bool = os.getenv("BROWSER_POOL_WARM", "true").lower() == "true"
+    BROWSER_MAX_PAGES: int = int(os.getenv("BROWSER_MAX_PAGES", "50"))
+    BROWSER_MAX_MEMORY_MB: int = int(os.getenv("BROWSER_MAX_MEMORY_MB", "512"))
+    BROWSER_ACQUIRE_TIMEOUT: float = float(os.getenv("BROWSER_ACQUIRE_TIMEOUT", "60"))
+    BROWSER_HEALTHCHECK_INTERVAL: float = float(os.getenv("BROWSER_HEALTHCHECK_INTERVAL", "30"))
+    BROWSER_PAGE_LOAD_TIMEOUT: float = float(os.getenv("BROWSER_PAGE_LOAD_TIMEOUT", "30"))
+
+    SCRAPE_EXECUTOR_WORKERS: int = int(os.getenv("SCRAPE_EXECUTOR_WORKERS", os.getenv("BROWSER_POOL_SIZE", "2")))
+    SCRAPE_READY_TIMEOUT: float = float(os.getenv("SCRAPE_READY_TIMEOUT", "10"))
+    SCRAPE_TIMEOUT: float = float(os.getenv("SCRAPE_TIMEOUT", "60"))
+
+    HTTP_FETCH_TIMEOUT: float = float(os.getenv("HTTP_FETCH_TIMEOUT", "10"))
+    HTTP_MAX_CONNECTIONS: int = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+    HTTP_MAX_KEEPALIVE_CONNECTIONS: int = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "10"))
+    HTTP_KEEPALIVE_EXPIRY: float = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+    HTTP_USER_AGENT: str = os.getenv(
+        "HTTP_USER_AGENT",
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/138.0 Safari/537.36"
+    )
+    HTTP_TIER_FAILURE_THRESHOLD: int = int(os.getenv("HTTP_TIER_FAILURE_THRESHOLD", "3"))
+    HTTP_TIER_RETRY_INTERVAL: float = float(os.getenv("HTTP_TIER_RETRY_INTERVAL", "600"))
+    # "selectolax", "lxml", or the much slower pure-Python "html.parser"
+    HTML_PARSER: str = os.getenv("HTML_PARSER", "selectolax")
+    # Relative paths are resolved against the scraper_service directory
+    EXTRACTION_RULES_PATH: str = os.getenv("EXTRACTION_RULES_PATH", "extraction_rules.json")
+    RAW_HTML_ZSTD_LEVEL: int = int(os.getenv("RAW_HTML_ZSTD_LEVEL", "10"))
+    # Retention used by compact_pages.py
+    RAW_PAGE_KEEP_VERSIONS: int = int(os.getenv("RAW_PAGE_KEEP_VERSIONS", "3"))
+    RAW_PAGE_MIN_AGE_DAYS: int = int(os.getenv("RAW_PAGE_MIN_AGE_DAYS", "30"))
+
+    # Cached company data is served fresh for the soft TTL, then served stale while one
+    # background scrape refreshes it, until the key expires at the hard TTL
+    COMPANY_CACHE_SOFT_TTL: int = int(os.getenv("COMPANY_CACHE_SOFT_TTL", "86400"))
+    COMPANY_CACHE_HARD_TTL: int = int(os.getenv("COMPANY_CACHE_HARD_TTL", "604800"))
+    COMPANY_CACHE_REFRESH_RETRY: float = float(os.getenv("COMPANY_CACHE_REFRESH_RETRY", "300"))
+    COMPANY_CACHE_INVALIDATION_CHANNEL: str = os.getenv("COMPANY_CACHE_INVALIDATION_CHANNEL", "company_cache:invalidations")
+    # On a Redis miss the latest transformed_data row is served if it is younger than this;
+    # older rows count as missing and the company is scraped again
+    COMPANY_DATA_MAX_AGE: int = int(os.getenv("COMPANY_DATA_MAX_AGE", "2592000"))
+    COMPANY_CACHE_WARM_ON_STARTUP: bool = os.getenv("COMPANY_CACHE_WARM_ON_STARTUP", "false").lower() == "true"
+    LOCAL_COMPANY_CACHE_MAX_SIZE: int = int(os.getenv("LOCAL_COMPANY_CACHE_MAX_SIZE", "10000"))
+    LOCAL_COMPANY_CACHE_TTL: float = float(os.getenv("LOCAL_COMPANY_CACHE_TTL", "300"))
+
+    WORKER_CONCURRENCY: int = int(os.getenv("WORKER_CONCURRENCY", os.getenv("BROWSER_POOL_SIZE", "2")))
+    JOB_MAX_ATTEMPTS: int = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+    JOB_RETRY_BASE_DELAY: float = float(os.getenv("JOB_RETRY_BASE_DELAY", "5"))
+    JOB_RETRY_MAX_DELAY: float = float(os.getenv("JOB_RETRY_MAX_DELAY", "300"))
+    JOB_VISIBILITY_TIMEOUT: float = float(os.getenv("JOB_VISIBILITY_TIMEOUT", "300"))
+    JOB_POLL_INTERVAL: float = float(os.getenv("JOB_POLL_INTERVAL", "5"))
+    JOB_RESULT_TTL_HOURS: int = int(os.getenv("JOB_RESULT_TTL_HOURS", "24"))
+    JOB_STREAM_MAXLEN: int = int(os.getenv("JOB_STREAM_MAXLEN", "100000"))
+    SCRAPE_LOCK_TTL: int = int(os.getenv("SCRAPE_LOCK_TTL", "900"))
+    JOB_LONG_POLL_MAX_WAIT: float = float(os.getenv("JOB_LONG_POLL_MAX_WAIT", "25"))
+    JOB_SSE_HEARTBEAT: float = float(os.getenv("JOB_SSE_HEARTBEAT", "15"))
+    JOB_SSE_MAX_DURATION: float = float(os.getenv("JOB_SSE_MAX_DURATION", "600"))
+    JOB_BATCH_MAX_SIZE: int = int(os.getenv("JOB_BATCH_MAX_SIZE", "10000"))
+    JOB_BATCH_CHUNK_SIZE: int = int(os.getenv("JOB_BATCH_CHUNK_SIZE", "25"))
+    JOB_BATCH_MAX_WAIT: float = float(os.getenv("JOB_BATCH_MAX_WAIT", "300"))
+
+    TRACING_ENABLED: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+    # "otlp" sends to OTEL_EXPORTER_OTLP_ENDPOINT, "file" appends JSON lines to TRACING_FILE_PATH
+    TRACING_EXPORTER: str = os.getenv("TRACING_EXPORTER", "otlp")
+    TRACING_FILE_PATH: str = os.getenv("TRACING_FILE_PATH", "traces.jsonl")
+    TRACING_SAMPLE_RATIO: float = float(os.getenv("TRACING_SAMPLE_RATIO", "0.1"))
+
+    # The worker has no HTTP app, so it serves /metrics on its own port
+    WORKER_METRICS_PORT: int = int(os.getenv("WORKER_METRICS_PORT", "9100"))
+
 settings = Settings()
@@ -0,0 +1,172 @@
+import os
+import re
+import json
+from datetime import datetime, date
+from typing import Optional, Dict, Any, List, Callable
+
+from config import settings
+from parsers import clean_text
+
+DATE_FORMATS = ("%d.%m.%Y", "%d/%m/%Y", "%d-%m-%Y", "%Y-%m-%d")
+
+def parse_date(text: str) -> Optional[date]:
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+NORMALIZERS: Dict[str, Callable[[Any], Any]] = {
+    "whitespace": clean_text,
+    "lower": str.lower,
+    "upper": str.upper,
+    "date": parse_date
+}
+
+RULE_KEYS = {"selectors", "labels", "contains_any", "pattern", "min_length", "many", "max_values", "normalize"}
+
+def label_key(text: str) -> str:
+    return " ".join(text.split()).rstrip(":").strip().lower()
+
+class FieldRule:
+    def __init__(self, name: str, spec: Dict[str, Any]):
+        unknown = set(spec) - RULE_KEYS
+        if unknown:
+            raise ValueError(f"Rule {name!r} has unknown keys: {', '.join(sorted(unknown))}")
+        if not spec.get("selectors") and not spec.get("labels"):
+            raise ValueError(f"Rule {name!r} needs selectors or labels")
+
+        self.name = name
+        # Selectors are tried in order; labels are a fallback when no selector matches
+        self.selectors: List[str] = spec.get("selectors", [])
+        self.labels = {label_key(label) for label in spec.get("labels", [])}
+        self.contains_any = tuple(word.lower() for word in spec.get("contains_any", []))
+        self.pattern = re.compile(spec["pattern"]) if "pattern" in spec else None
+        self.min_length: int = spec.get("min_length", 1)
+        # List fields collect consecutive matching text nodes after their label
+        self.many: bool = spec.get("many", False)
+        self.max_values: int = spec.get("max_values", 20)
+
+        normalize = spec.get("normalize", ["whitespace"])
+        missing = [normalizer for normalizer in normalize if normalizer not in NORMALIZERS]
+        if missing:
+            raise ValueError(f"Rule {name!r} uses unknown normalizers: {', '.join(missing)}")
+        self.normalizers = [NORMALIZERS[normalizer] for normalizer in normalize]
+
+    def empty(self):
+        return [] if self.many else None
+
+    def normalize(self, value: str):
+        for normalizer in self.normalizers:
+            value = normalizer(value)
+            if not value:
+                return None
+        return value
+
+    def values(self, text: str) -> List[Any]:
+        # Cheap substring checks first; only likely matches pay for the regex and normalisers
+        if self.contains_any:
+            lowered = text.lower()
+            if not any(word in lowered for word in self.contains_any):
+                return []
+
+        if self.pattern is None:
+            candidates = [text]
+        elif self.many:
+            candidates = [match.group(match.lastindex or 0) for match in self.pattern.finditer(text)]
+        else:
+            match = self.pattern.search(text)
+            candidates = [match.group(match.lastindex or 0)] if match else []
+
+        values = []
+        for candidate in candidates:
+            value = self.normalize(candidate)
+            if value and (not isinstance(value, str) or len(value) >= self.min_length):
+                values.append(value)
+        return values
+
+class ExtractionRules:
+    def __init__(self, version: int, rules: List[FieldRule]):
+        self.version = version
+        self.rules = rules
+
+        self.labels: Dict[str, FieldRule] = {}
+        for rule in rules:
+            for label in rule.labels:
+                if label in self.labels:
+                    raise ValueError(f"Label {label!r} is used by both {self.labels[label].name!r} and {rule.name!r}")
+                self.labels[label] = rule
+        # Longer text nodes can't be labels, so they skip the lookup entirely
+        self.max_label_length = max((len(label) for label in self.labels), default=0) + 8
+
+    @classmethod
+    def load(cls, path: str) -> "ExtractionRules":
+        if not os.path.isabs(path):
+            path = os.path.join(os.path.dirname(os.path.abspath(__file__)), path)
+        with open(path) as rules_file:
+            config = json.load(rules_file)
+        return cls(
+            version=int(config["version"]),
+            rules=[FieldRule(name, spec) for name, spec in config["fields"].items()]
+        )
+
+    def field_names(self) -> List[str]:
+        return [rule.name for rule in self.rules]
+
+    def extract(self, parser, html_content: str) -> Dict[str, Any]:
+        document = parser.parse(html_content)
+        result = {rule.name: rule.empty() for rule in self.rules}
+
+        for rule in self.rules:
+            for selector in rule.selectors:
+                value = rule.values(parser.select_text(document, selector) or "")
+                if value:
+                    result[rule.name] = value if rule.many else value[0]
+                    break
+
+        # Every label-driven field is filled in a single pass over the text nodes
+        remaining = {rule.name for rule in self.rules if rule.labels and not result[rule.name]}
+        if not remaining:
+            return result
+
+        active: List[FieldRule] = []
+        for text in parser.texts(document):
+            stripped = text.strip()
+            if not stripped:
+                continue
+
+            if len(stripped) <= self.max_label_length:
+                rule = self.labels.get(label_key(stripped))
+                if rule is not None:
+                    # A new label ends every open field; one left empty stays in remaining for a later label
+                    for collecting in active:
+                        if result[collecting.name]:
+                            remaining.discard(collecting.name)
+                    active.clear()
+                    if rule.name in remaining:
+                        active.append(rule)
+                    continue
+
+            for rule in list(active):
+                values = rule.values(text)
+                if rule.many:
+                    # Before the first value anything is skipped; after it, the first non-match ends the list
+                    if not values and not result[rule.name]:
+                        continue
+                    result[rule.name].extend(values[:rule.max_values - len(result[rule.name])])
+                    if values and len(result[rule.name]) < rule.max_values:
+                        continue
+                elif values:
+                    result[rule.name] = values[0]
+                else:
+                    continue
+                active.remove(rule)
+                remaining.discard(rule.name)
+
+            if not remaining:
+                break
+
+        return result
+
+extraction_rules = ExtractionRules.load(settings.EXTRACTION_RULES_PATH)
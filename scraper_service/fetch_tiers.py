@@ -0,0 +1,69 @@
+import re
+import time
+from urllib.parse import urlparse
+from typing import Dict, Any
+from config import settings
+
+TIER_HTTP = "http"
+TIER_BROWSER = "browser"
+
+def url_pattern(url: str) -> str:
+    # https://openmoney.md/companies/1003600000000 -> openmoney.md/companies/{id}
+    parsed = urlparse(url)
+    return parsed.netloc + re.sub(r"/\d+", "/{id}", parsed.path)
+
+class TierStats:
+    def __init__(self):
+        self.http_successes = 0
+        self.http_failures = 0
+        self.consecutive_http_failures = 0
+        self.skip_http_until = 0.0
+        self.browser_fetches = 0
+
+class TierMemory:
+    def __init__(self, failure_threshold: int, retry_interval: float):
+        self.failure_threshold = failure_threshold
+        self.retry_interval = retry_interval
+        self._patterns: Dict[str, TierStats] = {}
+
+    def _stats(self, pattern: str) -> TierStats:
+        return self._patterns.setdefault(pattern, TierStats())
+
+    def should_try_http(self, pattern: str) -> bool:
+        # After repeated misses the plain-HTTP tier is skipped, then re-probed once the interval passes
+        return time.monotonic() >= self._stats(pattern).skip_http_until
+
+    def record_http(self, pattern: str, success: bool):
+        stats = self._stats(pattern)
+        if success:
+            stats.http_successes += 1
+            stats.consecutive_http_failures = 0
+            stats.skip_http_until = 0.0
+            return
+
+        stats.http_failures += 1
+        stats.consecutive_http_failures += 1
+        if stats.consecutive_http_failures >= self.failure_threshold:
+            stats.skip_http_until = time.monotonic() + self.retry_interval
+
+    def record_browser(self, pattern: str):
+        self._stats(pattern).browser_fetches += 1
+
+    def preferred_tier(self, pattern: str) -> str:
+        return TIER_HTTP if self.should_try_http(pattern) else TIER_BROWSER
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            pattern: {
+                "preferred_tier": self.preferred_tier(pattern),
+                "http_successes": stats.http_successes,
+                "http_failures": stats.http_failures,
+                "browser_fetches": stats.browser_fetches
+            }
+            for pattern, stats in self._patterns.items()
+        }
+
+tier_memory = TierMemory(
+    failure_threshold=settings.HTTP_TIER_FAILURE_THRESHOLD,
+    retry_interval=settings.HTTP_TIER_RETRY_INTERVAL
+)
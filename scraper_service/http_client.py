@@ -0,0 +1,29 @@
+import httpx
+from typing import Optional
+from config import settings
+
+http_client: Optional[httpx.AsyncClient] = None
+
+async def start_http_client():
+    global http_client
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.HTTP_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=settings.HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(settings.HTTP_FETCH_TIMEOUT),
+        headers={"User-Agent": settings.HTTP_USER_AGENT},
+        follow_redirects=True
+    )
+
+async def close_http_client():
+    global http_client
+    if http_client is not None:
+        await http_client.aclose()
+        http_client = None
+
+def get_http_client() -> httpx.AsyncClient:
+    if http_client is None:
+        raise RuntimeError("HTTP client is not started")
+    return http_client
@@ -0,0 +1,128 @@
+import json
+import asyncio
+from datetime import timedelta
+from typing import Optional, Dict, Any, Callable, Awaitable, AsyncIterator
+
+from config import settings
+from redis_client import redis_client, pubsub_client
+from metrics import REDIS_OPERATION_DURATION, timed
+from job_queue import get_job, job_idnos, lock_key, JOB_COMPLETED, JOB_FAILED, JOB_DEAD
+from services import get_cached_result
+
+TERMINAL_STATUSES = {JOB_COMPLETED, JOB_FAILED, JOB_DEAD}
+
+def job_channel(job_id: str) -> str:
+    return f"scrape_events:job:{job_id}"
+
+def idno_channel(idno: str) -> str:
+    return f"scrape_events:idno:{idno}"
+
+StateLoader = Callable[[], Awaitable[Optional[Dict[str, Any]]]]
+
+@timed(REDIS_OPERATION_DURATION, "report_job_status")
+async def report_job_status(job_id: str, idno: str, status: str):
+    # The status write and both notifications share one round trip
+    message = json.dumps({"job_id": job_id, "idno": idno, "status": status})
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.setex(f"scraping_status:{idno}", timedelta(minutes=30), status)
+        pipe.publish(job_channel(job_id), message)
+        pipe.publish(idno_channel(idno), message)
+        await pipe.execute()
+
+@timed(REDIS_OPERATION_DURATION, "report_job_finished")
+async def report_job_finished(job_id: str, status: str):
+    # Sent once the job hash holds its final status; per-IDNO reports can arrive before that write
+    message = json.dumps({"job_id": job_id, "idno": None, "status": status})
+    await redis_client.publish(job_channel(job_id), message)
+
+async def job_state(job_id: str) -> Optional[Dict[str, Any]]:
+    job = await get_job(job_id)
+    if not job:
+        return None
+
+    idno = job.get("idno")
+    return {
+        "job_id": job_id,
+        "idno": idno,
+        "idnos": None if idno else job_idnos(job),
+        "status": job["status"],
+        "attempts": int(job.get("attempts", 0)),
+        "error": job.get("error") or None,
+        "data": await get_cached_result(idno, use_local=False) if idno and job["status"] == JOB_COMPLETED else None
+    }
+
+async def idno_state(idno: str) -> Optional[Dict[str, Any]]:
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.get(f"scraping_status:{idno}")
+        pipe.get(lock_key(idno))
+        status, job_id = await pipe.execute()
+    data = await get_cached_result(idno)
+    if status is None and data is None:
+        return None
+
+    return {
+        "job_id": job_id,
+        "idno": idno,
+        "idnos": None,
+        "status": status or JOB_COMPLETED,
+        "attempts": None,
+        "error": None,
+        "data": data
+    }
+
+async def watch_state(
+    channel: str,
+    load_state: StateLoader,
+    timeout: float,
+    heartbeat: Optional[float] = None
+) -> AsyncIterator[Optional[Dict[str, Any]]]:
+    # Yields the current state, then a fresh state after every event until it is terminal.
+    # With a heartbeat, None is yielded whenever nothing happened for that long.
+    pubsub = pubsub_client.pubsub()
+    try:
+        # Subscribe before reading state so an update between the two is never missed
+        await pubsub.subscribe(channel)
+        state = await load_state()
+        yield state
+        if state is None or state["status"] in TERMINAL_STATUSES:
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                return
+
+            wait = min(remaining, heartbeat) if heartbeat else remaining
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=wait)
+            if message is None:
+                if heartbeat:
+                    yield None
+                continue
+
+            state = await load_state()
+            yield state
+            if state is None or state["status"] in TERMINAL_STATUSES:
+                return
+    finally:
+        await pubsub.aclose()
+
+async def long_poll(channel: str, load_state: StateLoader, wait: float) -> Optional[Dict[str, Any]]:
+    state = None
+    async for state in watch_state(channel, load_state, min(wait, settings.JOB_LONG_POLL_MAX_WAIT)):
+        pass
+    return state
+
+async def sse_events(channel: str, load_state: StateLoader) -> AsyncIterator[str]:
+    async for state in watch_state(
+        channel,
+        load_state,
+        settings.JOB_SSE_MAX_DURATION,
+        heartbeat=settings.JOB_SSE_HEARTBEAT
+    ):
+        if state is None:
+            # SSE comment line; keeps proxies from timing out an idle stream
+            yield ": keep-alive\n\n"
+        else:
+            yield f"event: status\ndata: {json.dumps(state, default=str)}\n\n"
@@ -0,0 +1,290 @@
+import time
+import uuid
+import random
+from datetime import timedelta
+from typing import Optional, Dict, Any, List, Tuple, Set
+from redis.exceptions import ResponseError
+
+from config import settings
+from redis_client import redis_client, cache_scraping_status, cache_scraping_statuses
+from tracing import trace_context
+from metrics import REDIS_OPERATION_DURATION, timed
+
+JOB_STREAM = "scrape_jobs"
+JOB_DELAYED = "scrape_jobs:delayed"
+JOB_DEAD_LETTER = "scrape_jobs:dead"
+JOB_GROUP = "scrape_workers"
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_COMPLETED = "completed"
+JOB_FAILED = "failed"
+JOB_DEAD = "dead"
+
+# Moves due retries back onto the stream atomically so two workers can't both requeue a job
+PROMOTE_DELAYED_SCRIPT = redis_client.register_script("""
+local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, job_id in ipairs(due) do
+    redis.call('ZREM', KEYS[1], job_id)
+    redis.call('XADD', KEYS[2], 'MAXLEN', '~', ARGV[3], '*', 'job_id', job_id)
+end
+return #due
+""")
+
+# Deletes the lock only if it still belongs to the job, so a newer job's lock is never released
+RELEASE_LOCK_SCRIPT = redis_client.register_script("""
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+""")
+
+# Releases a gateway concurrency lease once the last job holding it has finished
+RELEASE_LEASE_SCRIPT = redis_client.register_script("""
+redis.call('SREM', KEYS[1], ARGV[1])
+if redis.call('SCARD', KEYS[1]) == 0 then
+    redis.call('ZREM', KEYS[2], ARGV[2])
+end
+return 1
+""")
+
+def job_key(job_id: str) -> str:
+    return f"scrape_job:{job_id}"
+
+def lock_key(idno: str) -> str:
+    return f"scrape_lock:{idno}"
+
+def lease_jobs_key(lease_id: str) -> str:
+    # Shared with the gateway, which leaves a lease in place while this set exists
+    return f"concurrency_jobs:{lease_id}"
+
+def parse_lease(lease: Optional[str]) -> Optional[Tuple[str, str]]:
+    # "<concurrency key> <lease id>", as set by the gateway's rate limiter
+    key, _, lease_id = (lease or "").rpartition(" ")
+    if not key.startswith("concurrency:") or not lease_id:
+        return None
+    return key, lease_id
+
+def hold_lease(pipe, lease: Optional[str], job_ids: List[str]):
+    parsed = parse_lease(lease)
+    if parsed is None or not job_ids:
+        return
+    lease_jobs = lease_jobs_key(parsed[1])
+    pipe.sadd(lease_jobs, *job_ids)
+    pipe.expire(lease_jobs, timedelta(hours=settings.JOB_RESULT_TTL_HOURS))
+
+def add_job(pipe, job_id: str, **fields):
+    pipe.hset(job_key(job_id), mapping={
+        "job_id": job_id,
+        "status": JOB_QUEUED,
+        "attempts": 0,
+        "created_at": time.time(),
+        **trace_context(),
+        **fields
+    })
+    pipe.expire(job_key(job_id), timedelta(hours=settings.JOB_RESULT_TTL_HOURS))
+    pipe.xadd(JOB_STREAM, {"job_id": job_id}, maxlen=settings.JOB_STREAM_MAXLEN, approximate=True)
+
+@timed(REDIS_OPERATION_DURATION, "enqueue_job")
+async def enqueue_job(idno: str, job_id: Optional[str] = None, lease: Optional[str] = None) -> str:
+    job_id = job_id or uuid.uuid4().hex
+
+    async with redis_client.pipeline() as pipe:
+        add_job(pipe, job_id, idno=idno, **({"lease": lease} if lease else {}))
+        hold_lease(pipe, lease, [job_id])
+        await pipe.execute()
+
+    return job_id
+
+def job_idnos(job: Dict[str, Any]) -> List[str]:
+    # Batch jobs carry a comma-separated idnos field instead of a single idno
+    return job["idnos"].split(",") if job.get("idnos") else [job["idno"]]
+
+@timed(REDIS_OPERATION_DURATION, "submit_scrape")
+async def submit_scrape(idno: str, lease: Optional[str] = None) -> Tuple[str, bool]:
+    # Single-flight: SET NX GET either takes the lock or returns the job already in flight
+    job_id = uuid.uuid4().hex
+    existing_job_id = await redis_client.set(
+        lock_key(idno), job_id, nx=True, get=True, ex=settings.SCRAPE_LOCK_TTL
+    )
+    if existing_job_id:
+        return existing_job_id, False
+
+    try:
+        await enqueue_job(idno, job_id, lease)
+    except Exception:
+        await release_scrape_lock(idno, job_id)
+        raise
+
+    await cache_scraping_status(idno, JOB_QUEUED)
+    return job_id, True
+
+@timed(REDIS_OPERATION_DURATION, "submit_batch")
+async def submit_batch(idnos: List[str], lease: Optional[str] = None) -> Tuple[str, Dict[str, str], Set[str]]:
+    # Misses are split into chunk jobs so a large batch spreads over all workers.
+    # Returns the batch id, the job each IDNO is attached to, and the IDNOs this call queued.
+    batch_id = uuid.uuid4().hex
+    chunk_size = settings.JOB_BATCH_CHUNK_SIZE
+
+    planned = []
+    async with redis_client.pipeline(transaction=False) as pipe:
+        for start in range(0, len(idnos), chunk_size):
+            job_id = uuid.uuid4().hex
+            for idno in idnos[start:start + chunk_size]:
+                pipe.set(lock_key(idno), job_id, nx=True, get=True, ex=settings.SCRAPE_LOCK_TTL)
+                planned.append((idno, job_id))
+        existing = await pipe.execute()
+
+    assignments = {}
+    new_jobs: Dict[str, List[str]] = {}
+    for (idno, job_id), existing_job_id in zip(planned, existing):
+        if existing_job_id:
+            assignments[idno] = existing_job_id
+        else:
+            assignments[idno] = job_id
+            new_jobs.setdefault(job_id, []).append(idno)
+
+    if new_jobs:
+        try:
+            async with redis_client.pipeline() as pipe:
+                for job_id, job_idnos in new_jobs.items():
+                    add_job(pipe, job_id, idnos=",".join(job_idnos), batch_id=batch_id, **({"lease": lease} if lease else {}))
+                hold_lease(pipe, lease, list(new_jobs))
+                await pipe.execute()
+        except Exception:
+            for job_id, job_idnos in new_jobs.items():
+                for idno in job_idnos:
+                    await release_scrape_lock(idno, job_id)
+            raise
+
+    queued = {idno for job_idnos in new_jobs.values() for idno in job_idnos}
+    await cache_scraping_statuses(list(queued), JOB_QUEUED)
+    return batch_id, assignments, queued
+
+@timed(REDIS_OPERATION_DURATION, "refresh_scrape_lock")
+async def refresh_scrape_lock(idno: str):
+    await redis_client.expire(lock_key(idno), settings.SCRAPE_LOCK_TTL)
+
+@timed(REDIS_OPERATION_DURATION, "release_scrape_lock")
+async def release_scrape_lock(idno: str, job_id: str):
+    await RELEASE_LOCK_SCRIPT(keys=[lock_key(idno)], args=[job_id])
+
+@timed(REDIS_OPERATION_DURATION, "get_job")
+async def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    job = await redis_client.hgetall(job_key(job_id))
+    return job or None
+
+@timed(REDIS_OPERATION_DURATION, "update_job")
+async def update_job(job_id: str, **fields):
+    async with redis_client.pipeline() as pipe:
+        pipe.hset(job_key(job_id), mapping={**fields, "updated_at": time.time()})
+        pipe.expire(job_key(job_id), timedelta(hours=settings.JOB_RESULT_TTL_HOURS))
+        await pipe.execute()
+
+@timed(REDIS_OPERATION_DURATION, "start_attempt")
+async def start_attempt(job_id: str) -> int:
+    async with redis_client.pipeline() as pipe:
+        pipe.hincrby(job_key(job_id), "attempts", 1)
+        pipe.hset(job_key(job_id), mapping={"status": JOB_RUNNING, "updated_at": time.time()})
+        attempts, _ = await pipe.execute()
+    return attempts
+
+async def ensure_consumer_group():
+    try:
+        # Start from 0 so jobs enqueued before the first worker started are not skipped
+        await redis_client.xgroup_create(JOB_STREAM, JOB_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+async def read_jobs(consumer: str, count: int, block_ms: int) -> List[Tuple[str, str]]:
+    # The blocking read has to return before the pooled connection's socket timeout fires
+    block_ms = min(block_ms, int(settings.REDIS_SOCKET_TIMEOUT * 1000 / 2))
+    response = await redis_client.xreadgroup(
+        JOB_GROUP, consumer, {JOB_STREAM: ">"}, count=count, block=block_ms
+    )
+    return [
+        (message_id, fields["job_id"])
+        for _, messages in response or []
+        for message_id, fields in messages
+    ]
+
+@timed(REDIS_OPERATION_DURATION, "claim_stale_jobs")
+async def claim_stale_jobs(consumer: str, count: int) -> List[Tuple[str, str]]:
+    # Jobs held by a worker that died (or stalled) past the visibility timeout go to another worker
+    _, messages, _ = await redis_client.xautoclaim(
+        JOB_STREAM,
+        JOB_GROUP,
+        consumer,
+        min_idle_time=int(settings.JOB_VISIBILITY_TIMEOUT * 1000),
+        start_id="0-0",
+        count=count
+    )
+    return [(message_id, fields["job_id"]) for message_id, fields in messages if fields]
+
+@timed(REDIS_OPERATION_DURATION, "extend_job_visibility")
+async def extend_job_visibility(message_id: str, consumer: str):
+    # Re-claiming our own entry resets its idle time, so a long batch job is not
+    # handed to another worker by claim_stale_jobs while it is still running
+    await redis_client.xclaim(JOB_STREAM, JOB_GROUP, consumer, min_idle_time=0, message_ids=[message_id], justid=True)
+
+@timed(REDIS_OPERATION_DURATION, "release_concurrency_lease")
+async def release_concurrency_lease(job_id: str, lease: Optional[str]):
+    parsed = parse_lease(lease)
+    if parsed is None:
+        return
+    key, lease_id = parsed
+    await RELEASE_LEASE_SCRIPT(keys=[lease_jobs_key(lease_id), key], args=[job_id, lease_id])
+
+@timed(REDIS_OPERATION_DURATION, "ack_job")
+async def ack_job(message_id: str):
+    await redis_client.xack(JOB_STREAM, JOB_GROUP, message_id)
+
+def retry_delay(attempts: int) -> float:
+    delay = settings.JOB_RETRY_BASE_DELAY * (2 ** (attempts - 1))
+    return min(delay, settings.JOB_RETRY_MAX_DELAY) * random.uniform(0.5, 1.0)
+
+@timed(REDIS_OPERATION_DURATION, "schedule_retry")
+async def schedule_retry(message_id: str, job_id: str, attempts: int, error: str):
+    async with redis_client.pipeline() as pipe:
+        pipe.zadd(JOB_DELAYED, {job_id: time.time() + retry_delay(attempts)})
+        pipe.hset(job_key(job_id), mapping={"status": JOB_QUEUED, "error": error, "updated_at": time.time()})
+        pipe.xack(JOB_STREAM, JOB_GROUP, message_id)
+        await pipe.execute()
+
+@timed(REDIS_OPERATION_DURATION, "dead_letter")
+async def dead_letter(message_id: str, job_id: str, error: str):
+    async with redis_client.pipeline() as pipe:
+        pipe.xadd(JOB_DEAD_LETTER, {"job_id": job_id, "error": error}, maxlen=settings.JOB_STREAM_MAXLEN, approximate=True)
+        pipe.hset(job_key(job_id), mapping={"status": JOB_DEAD, "error": error, "updated_at": time.time()})
+        pipe.xack(JOB_STREAM, JOB_GROUP, message_id)
+        await pipe.execute()
+
+@timed(REDIS_OPERATION_DURATION, "promote_delayed_jobs")
+async def promote_delayed_jobs(limit: int = 100) -> int:
+    return await PROMOTE_DELAYED_SCRIPT(
+        keys=[JOB_DELAYED, JOB_STREAM],
+        args=[time.time(), limit, settings.JOB_STREAM_MAXLEN]
+    )
+
+async def queue_stats() -> Dict[str, Any]:
+    try:
+        async with redis_client.pipeline() as pipe:
+            pipe.xinfo_groups(JOB_STREAM)
+            pipe.zcard(JOB_DELAYED)
+            pipe.xlen(JOB_DEAD_LETTER)
+            groups, delayed, dead = await pipe.execute(raise_on_error=False)
+
+        group = next(
+            (g for g in groups if g["name"] == JOB_GROUP),
+            {}
+        ) if isinstance(groups, list) else {}
+        return {
+            "waiting": group.get("lag") or 0,
+            "in_progress": group.get("pending", 0),
+            "delayed": delayed if isinstance(delayed, int) else 0,
+            "dead_lettered": dead if isinstance(dead, int) else 0
+        }
+    except Exception as e:
+        print(f"Error retrieving job queue stats: {str(e)}")
+        return {}
@@ -1,34 +1,82 @@
-from fastapi import FastAPI, HTTPException, Depends, BackgroundTasks
+import asyncio
+from contextlib import asynccontextmanager, suppress
+from typing import Optional
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Header
+from fastapi.responses import StreamingResponse, ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
 
-from database import Base, engine, get_db
-from schemas import ScrapeRequest, ScrapeResponse, CompanyData
-from services import scrape_company_data, get_cached_result
+from database import Base, engine
+from schemas import ScrapeRequest, ScrapeResponse, CompanyData, JobStatusResponse
+from services import get_cached_result
+from company_cache import company_cache, listen_for_invalidations
+from warm_cache import warm_company_cache
+from job_queue import submit_scrape, queue_stats
+from redis_client import redis_client, binary_redis_client, pubsub_client, company_etag
+from job_events import job_channel, idno_channel, job_state, idno_state, long_poll, sse_events
+from batch import parse_batch_request, stream_batch_results
+from config import settings
+from tracing import setup_tracing
+from metrics import setup_metrics, JOB_QUEUE_DEPTH
 
-app = FastAPI(title="Scraper Service", version="1.0.0")
+async def refresh_queue_depth():
+    # Queue depth lives in Redis, so it is read when Prometheus scrapes rather than tracked locally
+    for state, count in (await queue_stats()).items():
+        JOB_QUEUE_DEPTH.labels(state).set(count)
+
+async def warm_cache_on_startup():
+    # Only fills IDNOs missing from Redis, so several instances starting together do little extra work
+    try:
+        await warm_company_cache()
+    except Exception as e:
+        print(f"Error warming company cache: {str(e)}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    invalidation_listener = asyncio.create_task(listen_for_invalidations())
+    warm_up = asyncio.create_task(warm_cache_on_startup()) if settings.COMPANY_CACHE_WARM_ON_STARTUP else None
+    yield
+    for task in (invalidation_listener, warm_up):
+        if task:
+            task.cancel()
+            with suppress(asyncio.CancelledError):
+                await task
+    await redis_client.aclose()
+    await binary_redis_client.aclose()
+    await pubsub_client.aclose()
+
+app = FastAPI(title="Scraper Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+setup_metrics(app, before_collect=refresh_queue_depth)
+setup_tracing(app)
 
 Base.metadata.create_all(bind=engine)
 
 oauth2_scheme = HTTPBearer(auto_error=False)
 
 @app.get("/")
-def health_check():
-    return {"service": "Scraper Service", "status": "running"}
+async def health_check():
+    return {
+        "service": "Scraper Service",
+        "status": "running",
+        "job_queue": await queue_stats(),
+        "company_cache_size": len(company_cache)
+    }
 
 @app.post("/scrape/", response_model=ScrapeResponse)
 async def scrape_company(
     request: ScrapeRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    response: Response,
+    concurrency_lease: Optional[str] = Header(None),
     credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
 ):
     
     if not credentials:
         raise HTTPException(status_code=401, detail="Authentication required")
     
-    cached_result = get_cached_result(request.idno)
-    if cached_result and not request.force_refresh:
+    # Stale entries are still returned here; get_cached_result refreshes them in the background
+    cached_result = None if request.force_refresh else await get_cached_result(request.idno)
+    if cached_result:
+        # Weak, because the gateway may serve the same data gzip- or brotli-encoded
+        response.headers["ETag"] = f'W/"{company_etag(cached_result)}"'
         return ScrapeResponse(
             success=True,
             message="Data retrieved from cache",
@@ -36,16 +84,81 @@ async def scrape_company(
             cached=True
         )
     
-    # Start background scraping task
-    background_tasks.add_task(
-        scrape_company_data,
-        request.idno,
-        db
-    )
+    # Hand the scrape to the worker pool; concurrent requests for the same IDNO share one job
+    # A new job also takes over the gateway's concurrency lease until it finishes
+    job_id, created = await submit_scrape(request.idno, concurrency_lease)
         
     return ScrapeResponse(
         success=True,
-        message="Scraping started in background",
+        message="Scraping job queued" if created else "Scraping already in progress",
         data=None,
-        cached=False
+        cached=False,
+        job_id=job_id
+    )
+
+@app.post("/scrape/batch")
+async def scrape_batch(
+    request: Request,
+    force_refresh: bool = False,
+    wait: float = settings.JOB_BATCH_MAX_WAIT,
+    concurrency_lease: Optional[str] = Header(None),
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    idnos, body_force_refresh = await parse_batch_request(request)
+    if not idnos:
+        raise HTTPException(status_code=400, detail="No IDNOs provided")
+
+    # Cached results are written first, scraped ones as their jobs complete
+    return StreamingResponse(
+        stream_batch_results(idnos, force_refresh or body_force_refresh, wait, concurrency_lease),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+
+async def watch_status(request: Request, channel: str, load_state, wait: float, not_found: str):
+    state = await load_state()
+    if state is None:
+        raise HTTPException(status_code=404, detail=not_found)
+
+    if "text/event-stream" in request.headers.get("accept", ""):
+        return StreamingResponse(
+            sse_events(channel, load_state),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+        )
+
+    if wait > 0:
+        state = await long_poll(channel, load_state, wait) or state
+    return state
+
+# Declared before /scrape/{idno}/status so /scrape/jobs/status resolves to a job id
+@app.get("/scrape/jobs/{job_id}", response_model=JobStatusResponse)
+async def get_scrape_job(
+    job_id: str,
+    request: Request,
+    wait: float = 0,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return await watch_status(
+        request, job_channel(job_id), lambda: job_state(job_id), wait, "Scraping job not found"
+    )
+
+@app.get("/scrape/{idno}/status", response_model=JobStatusResponse)
+async def get_scrape_status(
+    idno: str,
+    request: Request,
+    wait: float = 0,
+    credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+):
+    if not credentials:
+        raise HTTPException(status_code=401, detail="Authentication required")
+
+    return await watch_status(
+        request, idno_channel(idno), lambda: idno_state(idno), wait, "No scraping data for this IDNO"
     )
@@ -1,22 +1,55 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Date
+from sqlalchemy import Column, Integer, String, DateTime, Text, Date, JSON, ForeignKey, LargeBinary, Index, text
 from sqlalchemy.sql import func
 from database import Base
 
+class RawPage(Base):
+    __tablename__ = "raw_pages"
+
+    # sha256 of the page HTML, so refetching identical content never stores it twice
+    content_hash = Column(String(64), primary_key=True)
+    compressed_html = Column(LargeBinary, nullable=False)
+    size = Column(Integer, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+
 class SourceData(Base):
     __tablename__ = "source_data"
+    __table_args__ = (
+        # Serves the "last fetch of this IDNO" lookup made on every scrape
+        Index("ix_source_data_idno_id", "idno", "id"),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     idno = Column(String, index=True, nullable=False)
     url = Column(String, nullable=False)
-    raw_html = Column(Text, nullable=False)
+    # Only set on rows from before compressed storage; compact_pages.py moves it into raw_pages
+    raw_html = Column(Text, nullable=True)
+    content_hash = Column(String(64), ForeignKey("raw_pages.content_hash"), index=True, nullable=True)
     status_code = Column(Integer, nullable=False)
+    fetch_tier = Column(String, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
+    # Moved forward whenever a refetch returns the same HTML, which stores no new row
+    last_fetched_at = Column(DateTime, server_default=func.now(), nullable=True)
 
 class TransformedData(Base):
     __tablename__ = "transformed_data"
+    __table_args__ = (
+        # Serves the "latest row of this IDNO" read-through when Redis has no entry
+        Index("ix_transformed_data_idno_created_at", "idno", text("created_at DESC")),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
+    # The page this row was transformed from; the backfill upserts on it. NULL on rows from before
+    # it was recorded, and on rows whose page compact_pages.py deleted (those have source_deleted_at)
+    source_id = Column(Integer, ForeignKey("source_data.id", ondelete="SET NULL"), unique=True, nullable=True)
+    source_deleted_at = Column(DateTime, nullable=True)
     idno = Column(String, index=True, nullable=False)
     company_name = Column(String, nullable=True)
     address = Column(Text, nullable=True)
+    status = Column(String, nullable=True)
+    registration_date = Column(Date, nullable=True)
+    activity_codes = Column(JSON, nullable=True)
+    directors = Column(JSON, nullable=True)
+    # Version of extraction_rules.json that produced the row; older rows can be re-transformed from source_data
+    rules_version = Column(Integer, nullable=True)
+    # When the data was last confirmed from the source page, so unchanged refetches keep it fresh
     created_at = Column(DateTime, server_default=func.now())
\ No newline at end of file
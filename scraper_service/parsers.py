@@ -0,0 +1,81 @@
+import re
+from functools import lru_cache
+from typing import Optional, Iterator
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+from lxml.cssselect import CSSSelector
+from selectolax.lexbor import LexborHTMLParser
+
+from config import settings
+
+# Backends only parse, run a CSS selector and stream text nodes in document order;
+# what to extract from them is decided by the rules in extraction.py
+
+def clean_text(text):
+    if not text:
+        return None
+    return re.sub(r'\s+', ' ', text.strip())
+
+@lru_cache(maxsize=None)
+def compiled_selector(selector: str) -> CSSSelector:
+    return CSSSelector(selector)
+
+class SoupParser:
+    # The original pure-Python implementation, kept as a dependency-light fallback and benchmark baseline
+    name = "html.parser"
+
+    def parse(self, html_content: str):
+        return BeautifulSoup(html_content, 'html.parser')
+
+    def select_text(self, soup, selector: str) -> Optional[str]:
+        element = soup.select_one(selector)
+        return element.get_text() if element else None
+
+    def texts(self, soup) -> Iterator[str]:
+        return iter(soup.find_all(string=True))
+
+class LxmlParser:
+    name = "lxml"
+
+    def parse(self, html_content: str):
+        if not html_content or not html_content.strip():
+            return None
+        return lxml_html.document_fromstring(html_content)
+
+    def select_text(self, document, selector: str) -> Optional[str]:
+        if document is None:
+            return None
+        elements = compiled_selector(selector)(document)
+        return elements[0].text_content() if elements else None
+
+    def texts(self, document) -> Iterator[str]:
+        return document.itertext() if document is not None else iter(())
+
+class SelectolaxParser:
+    name = "selectolax"
+
+    def parse(self, html_content: str):
+        return LexborHTMLParser(html_content)
+
+    def select_text(self, tree, selector: str) -> Optional[str]:
+        node = tree.css_first(selector)
+        return node.text() if node is not None else None
+
+    def texts(self, tree) -> Iterator[str]:
+        if tree.root is None:
+            return iter(())
+        # Text nodes are streamed straight out of the DOM instead of collected up front
+        return (
+            node.text_content
+            for node in tree.root.traverse(include_text=True)
+            if node.tag == "-text"
+        )
+
+PARSERS = {parser.name: parser for parser in (LxmlParser, SelectolaxParser, SoupParser)}
+
+def get_parser(name: str):
+    if name not in PARSERS:
+        raise ValueError(f"Unknown HTML parser {name!r}, expected one of {', '.join(PARSERS)}")
+    return PARSERS[name]()
+
+html_parser = get_parser(settings.HTML_PARSER)
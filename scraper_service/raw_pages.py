@@ -0,0 +1,42 @@
+import hashlib
+from typing import Optional, Tuple
+import zstandard
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config import settings
+from database import dialect_insert
+from models import RawPage, SourceData
+
+def content_hash(html: str) -> str:
+    return hashlib.sha256(html.encode()).hexdigest()
+
+def compress_html(html: str) -> bytes:
+    # Compressor objects are not thread-safe and are cheap to create, so each call gets its own
+    return zstandard.ZstdCompressor(level=settings.RAW_HTML_ZSTD_LEVEL).compress(html.encode())
+
+def decompress_html(data: bytes) -> str:
+    return zstandard.ZstdDecompressor().decompress(data).decode()
+
+def source_html(raw_html: Optional[str], compressed: Optional[bytes]) -> Optional[str]:
+    # Rows written before compression still carry their HTML inline
+    if raw_html is not None:
+        return raw_html
+    return decompress_html(compressed) if compressed is not None else None
+
+async def last_fetch(db: AsyncSession, idno: str) -> Optional[Tuple[int, Optional[str]]]:
+    row = (await db.execute(
+        select(SourceData.id, SourceData.content_hash)
+        .where(SourceData.idno == idno)
+        .order_by(SourceData.id.desc())
+        .limit(1)
+    )).first()
+    return (row.id, row.content_hash) if row else None
+
+async def store_raw_page(db: AsyncSession, page_hash: str, compressed: bytes, size: int):
+    # Identical content is stored once; later fetches just reference the existing page
+    await db.execute(
+        dialect_insert(RawPage)
+        .values(content_hash=page_hash, compressed_html=compressed, size=size)
+        .on_conflict_do_nothing(index_elements=[RawPage.content_hash])
+    )
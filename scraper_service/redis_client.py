@@ -1,52 +1,145 @@
-import redis
-import json
+import hashlib
+import orjson
+import redis.asyncio as redis
 from datetime import timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List, Tuple, Set
 from config import settings
+from codec import encode_value, decode_value, encode_default
+from metrics import REDIS_OPERATION_DURATION, CACHE_REQUESTS, timed
 
-redis_client = redis.Redis(
+# Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of failing when the pool is exhausted
+redis_pool = redis.BlockingConnectionPool(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
     decode_responses=True
 )
+redis_client = redis.Redis(connection_pool=redis_pool)
 
-def cache_company_data(idno: str, company_data: Dict[str, Any], expire_hours: int = 24):
-    try:
-        # Convert datetime objects to strings for JSON serialization
-        serializable_data = {}
-        for key, value in company_data.items():
-            if hasattr(value, 'isoformat'):
-                serializable_data[key] = value.isoformat()
-            else:
-                serializable_data[key] = value
-        
-        redis_client.setex(
-            f"company:{idno}",
-            timedelta(hours=expire_hours),
-            json.dumps(serializable_data, default=str)
-        )
+# Cached values are binary (see codec.py), so they go through a pool that leaves responses undecoded
+binary_redis_pool = redis.BlockingConnectionPool(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+)
+binary_redis_client = redis.Redis(connection_pool=binary_redis_pool)
+
+# Subscriptions hold a connection for as long as a stream is open, so they
+# get their own pool and can never starve regular commands
+pubsub_client = redis.Redis(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    decode_responses=True
+)
+
+def company_key(idno: str) -> str:
+    return f"company:{idno}"
+
+def company_etag_key(idno: str) -> str:
+    return f"company_etag:{idno}"
+
+def company_cache_ttl(age: float) -> int:
+    # Data loaded from the database is cached with its real age, so old rows stay stale and get refreshed
+    return int(max(settings.COMPANY_CACHE_HARD_TTL - age, settings.COMPANY_CACHE_REFRESH_RETRY))
+
+def company_etag(company_data: Dict[str, Any]) -> str:
+    # Hash of the JSON form, so data decoded from any codec hashes the same as what was written
+    return hashlib.sha256(orjson.dumps(company_data, default=encode_default, option=orjson.OPT_SORT_KEYS)).hexdigest()[:32]
+
+def queue_company_write(pipe, idno: str, company_data: Dict[str, Any], age: float):
+    # Keys live for the hard TTL; how long ago they were written decides whether they are stale
+    pipe.setex(company_key(idno), company_cache_ttl(age), encode_value(company_data))
+    # The gateway answers If-None-Match from this key without reaching the services. It expires at the
+    # soft TTL, so requests for stale data get through and trigger the background refresh.
+    fresh_for = int(settings.COMPANY_CACHE_SOFT_TTL - age)
+    if fresh_for > 0:
+        pipe.setex(company_etag_key(idno), fresh_for, company_etag(company_data))
+    else:
+        pipe.delete(company_etag_key(idno))
+    pipe.publish(settings.COMPANY_CACHE_INVALIDATION_CHANNEL, idno)
+
+@timed(REDIS_OPERATION_DURATION, "cache_company_data")
+async def cache_company_data(idno: str, company_data: Dict[str, Any], age: float = 0):
+    try:
+        pipe = binary_redis_client.pipeline(transaction=False)
+        queue_company_write(pipe, idno, company_data, age)
+        await pipe.execute()
     except Exception as e:
         print(f"Error caching data for IDNO {idno}: {str(e)}")
 
-def get_cached_company_data(idno: str) -> Optional[Dict[str, Any]]:
+@timed(REDIS_OPERATION_DURATION, "cache_company_data_many")
+async def cache_company_data_many(companies: Dict[str, Dict[str, Any]], ages: Optional[Dict[str, float]] = None):
+    # One pipelined round trip for the whole batch
+    ages = ages or {}
+    try:
+        pipe = binary_redis_client.pipeline(transaction=False)
+        for idno, company_data in companies.items():
+            queue_company_write(pipe, idno, company_data, ages.get(idno, 0))
+        await pipe.execute()
+    except Exception as e:
+        print(f"Error caching data for {len(companies)} IDNOs: {str(e)}")
+
+@timed(REDIS_OPERATION_DURATION, "cached_company_idnos")
+async def cached_company_idnos(idnos: List[str]) -> Set[str]:
+    pipe = binary_redis_client.pipeline(transaction=False)
+    for idno in idnos:
+        pipe.exists(company_key(idno))
+    return {idno for idno, exists in zip(idnos, await pipe.execute()) if exists}
+
+@timed(REDIS_OPERATION_DURATION, "get_cached_company_data")
+async def get_cached_company_data(idno: str) -> Optional[Tuple[Dict[str, Any], float]]:
+    # Returns the data with its age in seconds, derived from the remaining TTL
     try:
-        cached_data = redis_client.get(f"company:{idno}")
+        pipe = binary_redis_client.pipeline(transaction=False)
+        pipe.get(company_key(idno))
+        pipe.ttl(company_key(idno))
+        cached_data, ttl = await pipe.execute()
         if cached_data:
-            return json.loads(cached_data)
+            CACHE_REQUESTS.labels("company_data", "hit").inc()
+            age = settings.COMPANY_CACHE_HARD_TTL - ttl if ttl >= 0 else 0
+            return decode_value(cached_data), max(age, 0)
+        CACHE_REQUESTS.labels("company_data", "miss").inc()
         return None
     except Exception as e:
+        CACHE_REQUESTS.labels("company_data", "error").inc()
         print(f"Error retrieving cached data for IDNO {idno}: {str(e)}")
         return None
 
-def invalidate_company_cache(idno: str):
+@timed(REDIS_OPERATION_DURATION, "get_cached_company_data_many")
+async def get_cached_company_data_many(idnos: List[str], chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+    # All MGET chunks go out in a single pipelined round trip
+    try:
+        pipe = binary_redis_client.pipeline(transaction=False)
+        for start in range(0, len(idnos), chunk_size):
+            pipe.mget([company_key(idno) for idno in idnos[start:start + chunk_size]])
+        values = [value for chunk in await pipe.execute() for value in chunk]
+        cached = {idno: decode_value(value) for idno, value in zip(idnos, values) if value}
+        CACHE_REQUESTS.labels("company_data", "hit").inc(len(cached))
+        CACHE_REQUESTS.labels("company_data", "miss").inc(len(idnos) - len(cached))
+        return cached
+    except Exception as e:
+        CACHE_REQUESTS.labels("company_data", "error").inc(len(idnos))
+        print(f"Error retrieving cached data for {len(idnos)} IDNOs: {str(e)}")
+        return {}
+
+@timed(REDIS_OPERATION_DURATION, "invalidate_company_cache")
+async def invalidate_company_cache(idno: str):
     try:
-        redis_client.delete(f"company:{idno}")
+        pipe = redis_client.pipeline(transaction=False)
+        pipe.delete(company_key(idno), company_etag_key(idno))
+        pipe.publish(settings.COMPANY_CACHE_INVALIDATION_CHANNEL, idno)
+        await pipe.execute()
     except Exception as e:
         print(f"Error invalidating cache for IDNO {idno}: {str(e)}")
 
-def cache_scraping_status(idno: str, status: str, expire_minutes: int = 30):
+@timed(REDIS_OPERATION_DURATION, "cache_scraping_status")
+async def cache_scraping_status(idno: str, status: str, expire_minutes: int = 30):
     try:
-        redis_client.setex(
+        await redis_client.setex(
             f"scraping_status:{idno}",
             timedelta(minutes=expire_minutes),
             status
@@ -54,9 +147,31 @@ def cache_scraping_status(idno: str, status: str, expire_minutes: int = 30):
     except Exception as e:
         print(f"Error caching scraping status for IDNO {idno}: {str(e)}")
 
-def get_scraping_status(idno: str) -> Optional[str]:
+@timed(REDIS_OPERATION_DURATION, "get_scraping_status")
+async def get_scraping_status(idno: str) -> Optional[str]:
     try:
-        return redis_client.get(f"scraping_status:{idno}")
+        return await redis_client.get(f"scraping_status:{idno}")
     except Exception as e:
         print(f"Error retrieving scraping status for IDNO {idno}: {str(e)}")
-        return None
\ No newline at end of file
+        return None
+
+@timed(REDIS_OPERATION_DURATION, "cache_scraping_statuses")
+async def cache_scraping_statuses(idnos: List[str], status: str, expire_minutes: int = 30):
+    try:
+        pipe = redis_client.pipeline(transaction=False)
+        for idno in idnos:
+            pipe.setex(f"scraping_status:{idno}", timedelta(minutes=expire_minutes), status)
+        await pipe.execute()
+    except Exception as e:
+        print(f"Error caching scraping status for {len(idnos)} IDNOs: {str(e)}")
+
+@timed(REDIS_OPERATION_DURATION, "get_scraping_statuses")
+async def get_scraping_statuses(idnos: List[str]) -> Dict[str, str]:
+    if not idnos:
+        return {}
+    try:
+        values = await redis_client.mget([f"scraping_status:{idno}" for idno in idnos])
+        return {idno: value for idno, value in zip(idnos, values) if value}
+    except Exception as e:
+        print(f"Error retrieving scraping status for {len(idnos)} IDNOs: {str(e)}")
+        return {}
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, AliasChoices
 from datetime import date, datetime
 from typing import Optional, List
 
@@ -10,7 +10,13 @@ class CompanyData(BaseModel):
     idno: str
     company_name: Optional[str] = None
     address: Optional[str] = None
-    scraped_at: datetime
+    status: Optional[str] = None
+    registration_date: Optional[date] = None
+    activity_codes: Optional[List[str]] = None
+    directors: Optional[List[str]] = None
+    rules_version: Optional[int] = None
+    # Cached and stored records carry the timestamp as created_at
+    scraped_at: datetime = Field(validation_alias=AliasChoices("scraped_at", "created_at"))
 
     class Config:
         from_attributes = True
@@ -19,4 +25,14 @@ class ScrapeResponse(BaseModel):
     success: bool
     message: str
     data: Optional[CompanyData] = None
-    cached: bool
\ No newline at end of file
+    cached: bool
+    job_id: Optional[str] = None
+
+class JobStatusResponse(BaseModel):
+    job_id: Optional[str] = None
+    idno: Optional[str] = None
+    idnos: Optional[List[str]] = None
+    status: str
+    attempts: Optional[int] = None
+    error: Optional[str] = None
+    data: Optional[CompanyData] = None
@@ -1,43 +1,117 @@
-import re
+import asyncio
+import httpx
 import time
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from sqlalchemy.orm import Session
-from bs4 import BeautifulSoup
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Optional, Dict, Any
-from selenium import webdriver
+from selenium.common.exceptions import TimeoutException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 
+from config import settings
+from database import dialect_insert
 from models import SourceData, TransformedData
-from redis_client import cache_company_data, get_cached_company_data
+from raw_pages import content_hash, compress_html, last_fetch, store_raw_page
+from browser_pool import browser_pool
+from http_client import get_http_client
+from parsers import html_parser
+from extraction import extraction_rules
+from fetch_tiers import tier_memory, url_pattern, TIER_HTTP, TIER_BROWSER
+from redis_client import cache_company_data
+from company_cache import get_company_data, record_data
+from tracing import tracer
+from metrics import SCRAPE_PHASE_DURATION, SCRAPE_UNCHANGED_PAGES
 
-async def scrape_company_data(idno: str, db: Session):
+# Selenium is blocking, so browser work runs here instead of on the event loop
+scrape_executor = ThreadPoolExecutor(
+    max_workers=settings.SCRAPE_EXECUTOR_WORKERS,
+    thread_name_prefix="scrape"
+)
+
+COMPANY_URL = "https://openmoney.md/companies/{idno}"
+
+# Label preceding the address value that transform_company_data looks for
+ADDRESS_LABEL_XPATH = (
+    "//*[translate(normalize-space(text()), 'ADRES', 'adres')='adresa' "
+    "or translate(normalize-space(text()), 'ADRES', 'adres')='address']"
+)
+
+class ScrapeCancelled(Exception):
+    pass
+
+@contextmanager
+def scrape_phase(phase: str, idno: str):
+    # Each ETL phase is both a span on the job's trace and a sample in the phase histogram
+    started = time.perf_counter()
+    with tracer.start_as_current_span(f"scrape.{phase}", attributes={"scrape.idno": idno}) as span:
+        try:
+            yield span
+        finally:
+            SCRAPE_PHASE_DURATION.labels(phase).observe(time.perf_counter() - started)
+
+async def scrape_company_data(idno: str, db: AsyncSession):
     
     try:
         # Extract phase
-        raw_data = await extract_raw_data(idno)
-        if not raw_data:
-            return None
+        with scrape_phase("extract", idno) as span:
+            raw_data = await extract_raw_data(idno)
+            if not raw_data:
+                return None
+            span.set_attribute("scrape.tier", raw_data["tier"])
         
-        # Load phase
-        source_record = SourceData(
-            idno=idno,
-            url=raw_data["url"],
-            raw_html=raw_data["html"],
-            status_code=raw_data["status_code"]
-        )
-        db.add(source_record)
-        db.commit()
+        # Load phase (a page identical to the last fetch of this IDNO is not stored again)
+        with scrape_phase("load", idno) as span:
+            html = raw_data["html"]
+            page_hash = content_hash(html)
+            last = await last_fetch(db, idno)
+            unchanged = last is not None and last[1] == page_hash
+            span.set_attribute("scrape.unchanged", unchanged)
+
+            if unchanged:
+                source_id = last[0]
+                SCRAPE_UNCHANGED_PAGES.inc()
+                # Nothing new is stored, but the page was just confirmed, so its data's age starts over
+                fetched_at = datetime.now()
+                await db.execute(
+                    update(SourceData).where(SourceData.id == source_id).values(last_fetched_at=fetched_at)
+                )
+                await db.execute(
+                    update(TransformedData).where(TransformedData.source_id == source_id).values(created_at=fetched_at)
+                )
+                await db.commit()
+            else:
+                compressed = await asyncio.to_thread(compress_html, html)
+                await store_raw_page(db, page_hash, compressed, len(html))
+                source_record = SourceData(
+                    idno=idno,
+                    url=raw_data["url"],
+                    content_hash=page_hash,
+                    status_code=raw_data["status_code"],
+                    fetch_tier=raw_data["tier"]
+                )
+                db.add(source_record)
+                await db.commit()
+                source_id = source_record.id
         
-        # Transform phase
-        company_data = transform_company_data(raw_data["html"], idno)
-        if company_data:
-            transformed_record = TransformedData(**company_data)
-            db.add(transformed_record)
-            db.commit()
+        # Transform phase (skipped when the page is unchanged and already transformed with the current rules;
+        # the HTTP tier already transformed the page to validate it)
+        with scrape_phase("transform", idno):
+            company_data = await current_company_data(db, source_id) if unchanged else None
+            if company_data is None:
+                company_data = raw_data.get("company_data")
+                if company_data is None:
+                    company_data = await asyncio.to_thread(transform_company_data, html, idno)
+                if company_data:
+                    await db.execute(transformed_data_upsert(), [{"source_id": source_id, **company_data}])
+                    await db.commit()
 
-            cache_company_data(idno, company_data)
+        if company_data:
+            with scrape_phase("cache", idno):
+                await cache_company_data(idno, company_data)
             
             return company_data
         
@@ -47,76 +121,120 @@ async def scrape_company_data(idno: str, db: Session):
         print(f"Error scraping data for IDNO {idno}: {str(e)}")
         return None
 
+def transformed_data_upsert():
+    # One transformed_data row per source page; re-transforming a page replaces its row
+    statement = dialect_insert(TransformedData)
+    updated = [*extraction_rules.field_names(), "idno", "rules_version", "created_at"]
+    return statement.on_conflict_do_update(
+        index_elements=[TransformedData.source_id],
+        set_={column: statement.excluded[column] for column in updated}
+    )
+
+async def current_company_data(db: AsyncSession, source_id: int) -> Optional[Dict[str, Any]]:
+    record = (await db.execute(
+        select(TransformedData).where(TransformedData.source_id == source_id)
+    )).scalar_one_or_none()
+    if record is None or record.rules_version != extraction_rules.version:
+        return None
+    return record_data(record)
+
+def page_ready(cancelled: threading.Event):
+    def condition(driver):
+        if cancelled.is_set():
+            raise ScrapeCancelled()
+        return bool(
+            driver.find_elements(By.TAG_NAME, "h1")
+            and driver.find_elements(By.XPATH, ADDRESS_LABEL_XPATH)
+        )
+    return condition
+
+def fetch_with_browser(idno: str, cancelled: threading.Event):
+    url = COMPANY_URL.format(idno=idno)
+
+    with browser_pool.browser() as driver:
+        try:
+            if cancelled.is_set():
+                raise ScrapeCancelled()
+
+            driver.get(url)
+
+            try:
+                WebDriverWait(driver, settings.SCRAPE_READY_TIMEOUT, poll_frequency=0.2).until(
+                    page_ready(cancelled)
+                )
+            except TimeoutException:
+                # Some companies have no address; keep whatever has rendered so far
+                pass
+
+            html = driver.page_source
+        except ScrapeCancelled:
+            # The caller has already given up; hand the browser back intact
+            return None
+
+    return {
+        "html": html,
+        "url": url,
+        "status_code": 200,
+        "tier": TIER_BROWSER
+    }
+
+async def extract_with_http(idno: str):
+    url = COMPANY_URL.format(idno=idno)
+
+    try:
+        response = await get_http_client().get(url)
+    except httpx.HTTPError as e:
+        print(f"HTTP fetch failed for IDNO {idno}: {str(e)}")
+        return None
+
+    if response.status_code != 200:
+        return None
+
+    html = response.text
+    company_data = await asyncio.to_thread(transform_company_data, html, idno)
+    if not company_data or not company_data["company_name"] or not company_data["address"]:
+        return None
+
+    return {
+        "html": html,
+        "url": url,
+        "status_code": response.status_code,
+        "tier": TIER_HTTP,
+        "company_data": company_data
+    }
+
 async def extract_raw_data(idno: str):
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    
-    driver = webdriver.Chrome(options=options)
-    
+    # Plain HTTP is tried first; the browser is only used when the fields we need are not in the server HTML
+    pattern = url_pattern(COMPANY_URL.format(idno=idno))
+
+    if tier_memory.should_try_http(pattern):
+        raw_data = await extract_with_http(idno)
+        tier_memory.record_http(pattern, raw_data is not None)
+        if raw_data:
+            return raw_data
+
+    tier_memory.record_browser(pattern)
+    return await extract_with_browser(idno)
+
+async def extract_with_browser(idno: str):
+    cancelled = threading.Event()
+    loop = asyncio.get_running_loop()
+    future = loop.run_in_executor(scrape_executor, fetch_with_browser, idno, cancelled)
+
     try:
-        url = f"https://openmoney.md/companies/{idno}"
-        driver.get(url)
-        
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.TAG_NAME, "body"))
-        )
-        
-        time.sleep(3)
-        
-        html = driver.page_source
-        return {
-            "html": html,
-            "url": url,
-            "status_code": 200
-        }
-        
-    finally:
-        driver.quit()
+        return await asyncio.wait_for(future, timeout=settings.SCRAPE_TIMEOUT)
+    except (asyncio.TimeoutError, asyncio.CancelledError):
+        # Stops the worker thread at its next readiness poll
+        cancelled.set()
+        raise
     
 def transform_company_data(html_content: str, idno: str):
     
     try:
-        soup = BeautifulSoup(html_content, 'html.parser')
-        
-        text_content = soup.get_text()
-        
-        company_name = None
-        h1_element = soup.find('h1')
-        if h1_element:
-            company_name = clean_text(h1_element.get_text())
-
-        if not company_name:
-            title_element = soup.find('title')
-            if title_element:
-                title_text = clean_text(title_element.get_text())
-                if title_text:
-                    company_name = title_text
-        
-        address = None
-
-        all_text_elements = soup.find_all(text=True)
-        
-        found_address_label = False
-        for i, element in enumerate(all_text_elements):
-            text = clean_text(element)
-            if not text:
-                continue
-                
-            if text.lower() in ['adresa', 'address']:
-                found_address_label = True
-                continue
-
-            if found_address_label:
-                if text and len(text) > 10 and any(indicator in text.lower() for indicator in ['mun.', 'str.', 'bd.', 'chișinău', 'chisinau']):
-                    print("Gasit cu 1")
-                    address = text
-                    break
-
         return {
             "idno": idno,
-            "company_name": company_name,
-            "address": address,
+            **extraction_rules.extract(html_parser, html_content),
+            "rules_version": extraction_rules.version,
             "created_at": datetime.now()
         }
         
@@ -124,13 +242,8 @@ def transform_company_data(html_content: str, idno: str):
         print(f"Error transforming HTML data for IDNO {idno}: {str(e)}")
         return None
 
-def clean_text(text):
-            if not text:
-                return None
-            return re.sub(r'\s+', ' ', text.strip())
-
-def get_cached_result(idno: str) -> Optional[Dict[str, Any]]:
-    return get_cached_company_data(idno)
+async def get_cached_result(idno: str, use_local: bool = True) -> Optional[Dict[str, Any]]:
+    return await get_company_data(idno, use_local)
 
-def cache_result(idno: str, data: Dict[str, Any]) -> None:
-    cache_company_data(idno, data)
\ No newline at end of file
+async def cache_result(idno: str, data: Dict[str, Any]) -> None:
+    await cache_company_data(idno, data)
\ No newline at end of file
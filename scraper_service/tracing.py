@@ -0,0 +1,62 @@
+from typing import Optional, Dict
+from fastapi import FastAPI
+from opentelemetry import trace, propagate
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter, SpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
+from opentelemetry.instrumentation.redis import RedisInstrumentor
+from opentelemetry.instrumentation.sqlalchemy import SQLAlchemyInstrumentor
+from config import settings
+from database import engine, async_engine
+
+SERVICE_NAME = "scraper_service"
+
+tracer = trace.get_tracer(SERVICE_NAME)
+
+def span_exporter() -> Optional[SpanExporter]:
+    if settings.TRACING_EXPORTER == "otlp":
+        # Endpoint and headers come from the standard OTEL_EXPORTER_OTLP_* variables
+        return OTLPSpanExporter()
+    if settings.TRACING_EXPORTER == "file":
+        # One JSON span per line
+        return ConsoleSpanExporter(
+            out=open(settings.TRACING_FILE_PATH, "a"),
+            formatter=lambda span: span.to_json(indent=None) + "\n"
+        )
+    return None
+
+def setup_tracing(app: Optional[FastAPI] = None):
+    if not settings.TRACING_ENABLED:
+        return
+
+    # Sampling is decided once at the edge and followed by every downstream hop
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": SERVICE_NAME}),
+        sampler=ParentBased(TraceIdRatioBased(settings.TRACING_SAMPLE_RATIO))
+    )
+    exporter = span_exporter()
+    if exporter is not None:
+        # Spans are exported in batches off the request path
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(provider)
+
+    RedisInstrumentor().instrument(tracer_provider=provider)
+    SQLAlchemyInstrumentor().instrument(
+        engines=[engine, async_engine.sync_engine],
+        tracer_provider=provider
+    )
+
+    if app is not None:
+        FastAPIInstrumentor.instrument_app(app, tracer_provider=provider)
+
+def trace_context() -> Dict[str, str]:
+    # Serialized into queued jobs so the worker continues the request's trace
+    carrier: Dict[str, str] = {}
+    propagate.inject(carrier)
+    return carrier
+
+def job_context(job: Dict[str, str]):
+    return propagate.extract(job)
@@ -0,0 +1,81 @@
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import select, func
+
+from config import settings
+from database import Base, engine, async_engine
+from models import TransformedData
+from extraction import extraction_rules
+from company_cache import record_age
+from redis_client import redis_client, cache_company_data_many, cached_company_idnos
+
+# Usage: python warm_cache.py [--limit 100000] [--overwrite] [--batch-size 1000]
+# Loads the latest transformed_data row of each IDNO younger than COMPANY_DATA_MAX_AGE into Redis,
+# most recently scraped first. IDNOs already cached are skipped unless --overwrite is given.
+
+def latest_rows_query(max_age: float, limit: Optional[int]):
+    columns = ["idno", *extraction_rules.field_names(), "rules_version", "created_at"]
+    ranked = select(
+        *[getattr(TransformedData, column) for column in columns],
+        func.row_number().over(
+            partition_by=TransformedData.idno,
+            order_by=TransformedData.created_at.desc()
+        ).label("version")
+    ).where(TransformedData.created_at >= datetime.now() - timedelta(seconds=max_age)).subquery()
+
+    query = (
+        select(*[ranked.c[column] for column in columns])
+        .where(ranked.c.version == 1)
+        .order_by(ranked.c.created_at.desc())
+    )
+    return query.limit(limit) if limit else query
+
+async def warm_company_cache(
+    batch_size: int = 1000,
+    limit: Optional[int] = None,
+    overwrite: bool = False,
+    max_age: float = settings.COMPANY_DATA_MAX_AGE
+) -> int:
+    warmed = 0
+    started = time.monotonic()
+    async with async_engine.connect() as conn:
+        result = await conn.stream(latest_rows_query(max_age, limit).execution_options(yield_per=batch_size))
+        async for partition in result.partitions():
+            companies = {row.idno: dict(row._mapping) for row in partition}
+            if not overwrite:
+                for idno in await cached_company_idnos(list(companies)):
+                    del companies[idno]
+            if not companies:
+                continue
+
+            await cache_company_data_many(
+                companies,
+                ages={idno: record_age(data["created_at"]) for idno, data in companies.items()}
+            )
+            warmed += len(companies)
+            print(f"Warmed {warmed} companies")
+
+    print(f"Cache warm-up finished: {warmed} companies in {time.monotonic() - started:.1f}s")
+    return warmed
+
+async def main():
+    parser = argparse.ArgumentParser(description="Load recent transformed_data rows into the Redis company cache")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Rows per cursor batch and Redis pipeline")
+    parser.add_argument("--limit", type=int, help="Only warm this many of the most recently scraped IDNOs")
+    parser.add_argument("--overwrite", action="store_true", help="Also rewrite IDNOs that are already cached")
+    parser.add_argument("--max-age", type=float, default=settings.COMPANY_DATA_MAX_AGE,
+                        help="Skip rows older than this many seconds")
+    args = parser.parse_args()
+
+    Base.metadata.create_all(bind=engine)
+    try:
+        await warm_company_cache(args.batch_size, args.limit, args.overwrite, args.max_age)
+    finally:
+        await redis_client.aclose()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+import asyncio
+import os
+import socket
+import signal
+from typing import Optional, Dict
+from prometheus_client import start_http_server
+from opentelemetry.trace import SpanKind
+
+from config import settings
+from database import Base, engine, async_engine, async_session, db_pool_stats
+from services import scrape_company_data, scrape_executor
+from browser_pool import browser_pool
+from fetch_tiers import tier_memory
+from http_client import start_http_client, close_http_client
+from redis_client import redis_client
+from tracing import tracer, setup_tracing, job_context
+from metrics import register_stats
+from job_events import report_job_status, report_job_finished
+from job_queue import (
+    ensure_consumer_group, read_jobs, claim_stale_jobs, promote_delayed_jobs,
+    get_job, job_idnos, update_job, start_attempt, extend_job_visibility, ack_job, schedule_retry, dead_letter,
+    refresh_scrape_lock, release_scrape_lock, release_concurrency_lease,
+    JOB_QUEUED, JOB_RUNNING, JOB_COMPLETED, JOB_FAILED, JOB_DEAD
+)
+
+async def scrape_one(job_id: str, idno: str) -> Optional[str]:
+    await refresh_scrape_lock(idno)
+    await report_job_status(job_id, idno, JOB_RUNNING)
+
+    # Each scrape gets its own session, scoped to exactly this attempt
+    try:
+        async with async_session() as db:
+            result = await scrape_company_data(idno, db)
+        error = None if result else "Scraping returned no data"
+    except Exception as e:
+        error = str(e)
+
+    if error is None:
+        await report_job_status(job_id, idno, JOB_COMPLETED)
+        await release_scrape_lock(idno, job_id)
+    return error
+
+async def process_job(consumer: str, message_id: str, job_id: str):
+    job = await get_job(job_id)
+    if not job:
+        # The job hash expired; nothing left to do for this message
+        await ack_job(message_id)
+        return
+
+    # Continues the trace of the request that queued the job
+    with tracer.start_as_current_span(
+        "scrape_job",
+        context=job_context(job),
+        kind=SpanKind.CONSUMER,
+        attributes={"scrape.job_id": job_id}
+    ):
+        await run_job(consumer, message_id, job_id, job)
+
+async def run_job(consumer: str, message_id: str, job_id: str, job: Dict[str, str]):
+    idnos = job_idnos(job)
+    attempts = await start_attempt(job_id)
+
+    failures = {}
+    for idno in idnos:
+        error = await scrape_one(job_id, idno)
+        if error is not None:
+            failures[idno] = error
+        if len(idnos) > 1:
+            await extend_job_visibility(message_id, consumer)
+
+    if not failures:
+        await update_job(job_id, status=JOB_COMPLETED, error="")
+        await report_job_finished(job_id, JOB_COMPLETED)
+        await ack_job(message_id)
+        await release_concurrency_lease(job_id, job.get("lease"))
+        return
+
+    error = failures[idnos[0]] if len(idnos) == 1 else f"{len(failures)} of {len(idnos)} IDNOs failed"
+    if attempts < settings.JOB_MAX_ATTEMPTS:
+        print(f"Job {job_id} failed (attempt {attempts}), retrying: {error}")
+        if job.get("idnos"):
+            # Only the IDNOs that failed are retried
+            await update_job(job_id, idnos=",".join(failures))
+        await schedule_retry(message_id, job_id, attempts, error)
+        for idno in failures:
+            await report_job_status(job_id, idno, JOB_QUEUED)
+    else:
+        print(f"Job {job_id} failed after {attempts} attempts: {error}")
+        await dead_letter(message_id, job_id, error)
+        await report_job_finished(job_id, JOB_DEAD)
+        await release_concurrency_lease(job_id, job.get("lease"))
+        for idno in failures:
+            await report_job_status(job_id, idno, JOB_FAILED)
+            await release_scrape_lock(idno, job_id)
+
+async def consume(consumer: str, stopping: asyncio.Event):
+    while not stopping.is_set():
+        try:
+            await promote_delayed_jobs()
+
+            jobs = await claim_stale_jobs(consumer, 1)
+            if not jobs:
+                jobs = await read_jobs(consumer, 1, int(settings.JOB_POLL_INTERVAL * 1000))
+
+            for message_id, job_id in jobs:
+                await process_job(consumer, message_id, job_id)
+        except Exception as e:
+            print(f"Worker {consumer} error: {str(e)}")
+            await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+async def run_worker():
+    if settings.JOB_VISIBILITY_TIMEOUT <= settings.SCRAPE_TIMEOUT:
+        # Batch jobs extend their visibility after each IDNO, so one scrape has to fit in the timeout
+        print(
+            f"Warning: JOB_VISIBILITY_TIMEOUT ({settings.JOB_VISIBILITY_TIMEOUT}s) is not longer than "
+            f"SCRAPE_TIMEOUT ({settings.SCRAPE_TIMEOUT}s); running jobs may be claimed by another worker"
+        )
+    setup_tracing()
+    register_stats("browser_pool", browser_pool.stats)
+    register_stats("db_pool", db_pool_stats)
+    register_stats("fetch_tier", tier_memory.stats, label="pattern")
+    start_http_server(settings.WORKER_METRICS_PORT)
+    Base.metadata.create_all(bind=engine)
+    await ensure_consumer_group()
+    await start_http_client()
+    if settings.BROWSER_POOL_WARM:
+        await asyncio.to_thread(browser_pool.start)
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stopping.set)
+
+    # Consumer names must be unique per group so a crashed consumer's jobs can be reclaimed
+    name = f"{socket.gethostname()}-{os.getpid()}"
+    consumers = [
+        asyncio.create_task(consume(f"{name}-{i}", stopping))
+        for i in range(settings.WORKER_CONCURRENCY)
+    ]
+    print(f"Scraper worker {name} started with {settings.WORKER_CONCURRENCY} consumers")
+
+    try:
+        await asyncio.gather(*consumers)
+    finally:
+        scrape_executor.shutdown(wait=False, cancel_futures=True)
+        await asyncio.to_thread(browser_pool.shutdown)
+        await close_http_client()
+        await redis_client.aclose()
+        await async_engine.dispose()
+
+if __name__ == "__main__":
+    asyncio.run(run_worker())
@@ -1,11 +1,41 @@
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from config import settings
+from metrics import DB_POOL_CHECKOUT_WAIT
 
-engine = create_engine(settings.DATABASE_URL)
+def async_database_url(url: str) -> str:
+    if url.startswith(("postgresql://", "postgres://")):
+        return "postgresql+asyncpg://" + url.split("://", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = settings.DATABASE_ASYNC_URL or async_database_url(settings.DATABASE_URL)
+
+# The sync engine is only used for schema creation and scripts
+engine = create_engine(
+    settings.DATABASE_URL,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE
+)
 SessionLocal = sessionmaker(autocommit=False, bind=engine)
 
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_pre_ping=settings.DB_POOL_PRE_PING,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    # asyncpg keeps prepared statements per connection, so repeated queries skip parsing and planning
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+    if ASYNC_DATABASE_URL.startswith("postgresql+asyncpg") else {}
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +43,25 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+@asynccontextmanager
+async def async_session():
+    async with AsyncSessionLocal() as db:
+        # Checking the connection out up front makes pool exhaustion visible as wait time
+        started = time.perf_counter()
+        await db.connection()
+        DB_POOL_CHECKOUT_WAIT.observe(time.perf_counter() - started)
+        yield db
+
+async def get_async_db():
+    async with async_session() as db:
+        yield db
+
+def db_pool_stats() -> Dict[str, Any]:
+    pool = async_engine.pool
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow()
+    }
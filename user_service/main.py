@@ -1,13 +1,29 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
+from fastapi.responses import ORJSONResponse
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials, OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from database import Base, engine
-from database import get_db
+from database import get_async_db, db_pool_stats, async_engine
 from schemas import UserRegister, Token, UserResponse
 from services import *
+from tracing import setup_tracing
+from metrics import setup_metrics, register_stats
 
-app = FastAPI(title="User Service", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    password_hasher.start()
+    yield
+    password_hasher.shutdown()
+    await async_engine.dispose()
+
+app = FastAPI(title="User Service", version="1.0.0", lifespan=lifespan, default_response_class=ORJSONResponse)
+setup_metrics(app)
+setup_tracing(app)
+
+register_stats("db_pool", db_pool_stats)
+register_stats("password_hasher", password_hasher.stats)
 
 Base.metadata.create_all(bind=engine)
 
@@ -15,37 +31,40 @@ oauth2_scheme = HTTPBearer(auto_error=False)
 
 @app.get("/")
 def health_check():
-    return {"service": "User Service", "status": "running"}
+    return {
+        "service": "User Service",
+        "status": "running",
+        "db_pool": db_pool_stats(),
+        "password_hasher": password_hasher.stats()
+    }
 
 @app.post("/register/")
-def register(user: UserRegister, db: Session = Depends(get_db)):
-    return register_user(user, db)
+async def register(user: UserRegister, db: AsyncSession = Depends(get_async_db)):
+    return await register_user(user, db)
 
 @app.post("/login", response_model=Token)
 @app.post("/login/", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    result = authenticate_user(form_data.username, form_data.password, db)
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_async_db)):
+    result = await authenticate_user(form_data.username, form_data.password, db)
     return result
 
 @app.get("/verify-token/")
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+async def verify_token(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     token = credentials.credentials if credentials else None
-    return verify_user_session(token)
+    return await verify_user_session(token)
 
 @app.post("/logout/")
-def logout(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+async def logout(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
     token = credentials.credentials if credentials else None
-    return logout_user(token)
+    return await logout_user(token)
 
 @app.get("/users/me/", response_model=UserResponse)
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
     token = credentials.credentials if credentials else None
     if not token:
         raise HTTPException(status_code=401, detail="Token required")
-    session_info = verify_user_session(token)
-    user = get_user_info(session_info["user_id"], db)
-    return user
+    return await get_current_user_info(token, db)
 
 @app.get("/users/{user_id}/", response_model=UserResponse)
-def get_user_by_id(user_id: int, db: Session = Depends(get_db)):
-    return get_user_info(user_id, db)
\ No newline at end of file
+async def get_user_by_id(user_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await get_user_info(user_id, db)
\ No newline at end of file
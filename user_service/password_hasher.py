@@ -0,0 +1,70 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple, Dict, Any
+from fastapi import HTTPException
+
+from config import settings
+from auth import get_password_hash, verify_and_update_password
+from tracing import tracer
+
+class PasswordHasher:
+    def __init__(self, workers: int, queue_size: int):
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.executor: Optional[ProcessPoolExecutor] = None
+
+        self.in_flight = 0
+        self.rejected = 0
+
+    def start(self):
+        # spawn rather than fork: the parent already runs an event loop and Redis/DB pools
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn")
+        )
+
+    def shutdown(self):
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+    async def _run(self, func, *args):
+        if self.executor is None:
+            raise RuntimeError("Password hasher is not started")
+
+        # Shed load instead of queueing logins behind each other for seconds
+        if self.in_flight >= self.capacity:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Too many concurrent password checks, retry shortly",
+                headers={"Retry-After": "1"}
+            )
+
+        self.in_flight += 1
+        try:
+            with tracer.start_as_current_span(f"password_hasher.{func.__name__}"):
+                return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+        # Returns whether the password matched and, if the hash is outdated, its replacement
+        return await self._run(verify_and_update_password, password, hashed_password)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected
+        }
+
+password_hasher = PasswordHasher(
+    workers=settings.PASSWORD_HASH_WORKERS,
+    queue_size=settings.PASSWORD_HASH_QUEUE_SIZE
+)
@@ -1,58 +1,98 @@
-import redis
-import json
+import redis.asyncio as redis
+import hashlib
 from datetime import datetime, timedelta, timezone
 from config import settings
+from codec import encode_value, decode_value
+from metrics import REDIS_OPERATION_DURATION, CACHE_REQUESTS, timed
 
-redis_client = redis.Redis(
+# Callers wait up to REDIS_POOL_TIMEOUT for a free connection instead of failing when the pool is exhausted
+redis_pool = redis.BlockingConnectionPool(
     host=settings.REDIS_HOST,
     port=settings.REDIS_PORT,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT,
     decode_responses=True
 )
+redis_client = redis.Redis(connection_pool=redis_pool)
 
-def cache_token(token: str, user_data: dict, expire_minutes: int = 30):
+# Cached values are binary (see codec.py), so they go through a pool that leaves responses undecoded
+binary_redis_pool = redis.BlockingConnectionPool(
+    host=settings.REDIS_HOST,
+    port=settings.REDIS_PORT,
+    max_connections=settings.REDIS_MAX_CONNECTIONS,
+    timeout=settings.REDIS_POOL_TIMEOUT,
+    socket_timeout=settings.REDIS_SOCKET_TIMEOUT
+)
+binary_redis_client = redis.Redis(connection_pool=binary_redis_pool)
+
+# Drops the user's active session and its token in one round trip; returns the revoked token
+INVALIDATE_SESSION_SCRIPT = redis_client.register_script("""
+local token = redis.call('GET', KEYS[1])
+if token then
+    redis.call('DEL', ARGV[1] .. token)
+end
+redis.call('DEL', KEYS[1])
+return token
+""")
+
+@timed(REDIS_OPERATION_DURATION, "cache_token")
+async def cache_token(token: str, user_data: dict, expire_minutes: int = 30):
 
-    redis_client.setex(
+    await binary_redis_client.setex(
         f"token:{token}", 
         timedelta(minutes=expire_minutes), 
-        json.dumps(user_data)
+        encode_value(user_data)
     )
 
-def get_cached_token(token: str):
+@timed(REDIS_OPERATION_DURATION, "get_cached_token")
+async def get_cached_token(token: str):
 
-    cached_data = redis_client.get(f"token:{token}")
+    cached_data = await binary_redis_client.get(f"token:{token}")
     if cached_data:
-        return json.loads(cached_data)
+        CACHE_REQUESTS.labels("token", "hit").inc()
+        return decode_value(cached_data)
+    CACHE_REQUESTS.labels("token", "miss").inc()
     return None
 
-def invalidate_token(token: str):
+@timed(REDIS_OPERATION_DURATION, "invalidate_token")
+async def invalidate_token(token: str):
 
-    redis_client.delete(f"token:{token}")
+    await redis_client.delete(f"token:{token}")
 
-def cache_user_session(user_id: int, username: str, token: str):
+@timed(REDIS_OPERATION_DURATION, "cache_user_session")
+async def cache_user_session(user_id: int, username: str, token: str):
 
     session_data = {
         "user_id": user_id,
         "username": username,
         "token": token,
-        "login_time": json.dumps(datetime.now(timezone.utc), default=str)
+        "login_time": datetime.now(timezone.utc)
     }
-    
-    cache_token(token, session_data, expire_minutes=30)
 
-    redis_client.setex(
-        f"user_session:{user_id}",
-        timedelta(minutes=30),
-        token
-    )
+    # Both keys are written in a single MULTI/EXEC round trip
+    async with binary_redis_client.pipeline(transaction=True) as pipe:
+        pipe.setex(f"token:{token}", timedelta(minutes=30), encode_value(session_data))
+        pipe.setex(f"user_session:{user_id}", timedelta(minutes=30), token)
+        await pipe.execute()
+
+@timed(REDIS_OPERATION_DURATION, "get_user_active_session")
+async def get_user_active_session(user_id: int):
 
-def get_user_active_session(user_id: int):
+    return await redis_client.get(f"user_session:{user_id}")
 
-    return redis_client.get(f"user_session:{user_id}")
+@timed(REDIS_OPERATION_DURATION, "publish_session_revocation")
+async def publish_session_revocation(token: str):
+
+    # Services caching verified sessions in-process evict them on this message
+    await redis_client.publish(
+        settings.SESSION_REVOCATION_CHANNEL,
+        hashlib.sha256(token.encode()).hexdigest()
+    )
 
-def invalidate_user_session(user_id: int):
+@timed(REDIS_OPERATION_DURATION, "invalidate_user_session")
+async def invalidate_user_session(user_id: int):
 
-    token = get_user_active_session(user_id)
+    token = await INVALIDATE_SESSION_SCRIPT(keys=[f"user_session:{user_id}"], args=["token:"])
     if token:
-        invalidate_token(token)
-    
-    redis_client.delete(f"user_session:{user_id}")
\ No newline at end of file
+        await publish_session_revocation(token)
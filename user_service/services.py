@@ -1,22 +1,25 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import datetime, timedelta
 from fastapi import HTTPException
 
 from models import User
 from schemas import UserRegister
-from auth import get_password_hash, verify_password, create_access_token, verify_token
+from auth import create_access_token, verify_token
+from password_hasher import password_hasher
 from redis_client import *
 
-def register_user(user_data: UserRegister, db: Session):
+async def register_user(user_data: UserRegister, db: AsyncSession):
 
-    existing_user = db.query(User).filter(
+    result = await db.execute(select(User).where(
         (User.email == user_data.email) | (User.username == user_data.username)
-    ).first()
+    ))
+    existing_user = result.scalars().first()
     
     if existing_user:
         raise HTTPException(status_code=400, detail="Email or username already registered")
     
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         username=user_data.username,
         email=user_data.email,
@@ -24,21 +27,31 @@ def register_user(user_data: UserRegister, db: Session):
     )
     
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
     
     return {"message": "User registered successfully", "user_id": db_user.id}
 
-def authenticate_user(username: str, password: str, db: Session):
+async def authenticate_user(username: str, password: str, db: AsyncSession):
 
-    user = db.query(User).filter(User.username == username).first()
+    result = await db.execute(select(User).where(User.username == username))
+    user = result.scalars().first()
     
-    if not user or not verify_password(password, user.hashed_password):
+    if not user:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    valid, new_hash = await password_hasher.verify(password, user.hashed_password)
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this password was hashed
+        user.hashed_password = new_hash
+        await db.commit()
     
     access_token = create_access_token(data={"sub": user.username, "user_id": user.id})
     
-    cache_user_session(user.id, user.username, access_token)
+    await cache_user_session(user.id, user.username, access_token)
     
     return {
         "access_token": access_token,
@@ -46,9 +59,9 @@ def authenticate_user(username: str, password: str, db: Session):
         "expires_in": settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
     }
 
-def verify_user_session(token: str):
+async def verify_user_session(token: str):
 
-    cached_user = get_cached_token(token)
+    cached_user = await get_cached_token(token)
     if not cached_user:
         raise HTTPException(status_code=401, detail="Invalid or expired session")
 
@@ -58,19 +71,19 @@ def verify_user_session(token: str):
         "user_id": cached_user["user_id"]
     }
 
-def logout_user(token: str):
+async def logout_user(token: str):
 
-    cached_user = get_cached_token(token)
+    cached_user = await get_cached_token(token)
     if cached_user:
         user_id = cached_user.get("user_id")
-        invalidate_user_session(user_id)
+        await invalidate_user_session(user_id)
         return {"message": "Logout successfully"}
     
     return {"message": "Session not found"}
 
-def get_user_info(user_id: int, db: Session):
+async def get_user_info(user_id: int, db: AsyncSession):
 
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -81,7 +94,7 @@ def get_user_info(user_id: int, db: Session):
         "email": user.email
     }
 
-def get_current_user_info(token: str, db: Session):
+async def get_current_user_info(token: str, db: AsyncSession):
 
-    session_info = verify_user_session(token)
-    return get_user_info(session_info["user_id"], db)
+    session_info = await verify_user_session(token)
+    return await get_user_info(session_info["user_id"], db)